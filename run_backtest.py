@@ -51,8 +51,8 @@ def main():
         # 输出回测结果
         if result is not None:
             print("\n====== 回测结果 ======")
-            # 获取回测统计指标
-            statistics = engine.calculate_statistics(result)
+            # 获取回测时已计算的统计指标
+            statistics = engine.get_statistics()
             if statistics:
                 print(f"总收益率: {statistics['total_return']:.2f}%")
                 print(f"年化收益率: {statistics['annual_return']:.2f}%")
@@ -1,14 +1,20 @@
 import sys
 import time
 import logging
+import logging.handlers
+import queue
 import threading
 import os
+import atexit
+import signal
+import collections
+import functools
 from vnpy.trader.engine import MainEngine
-from vnpy.trader.ui import MainWindow, create_qapp
+from vnpy.trader.ui import MainWindow, create_qapp, QtCore
 from vnpy_binance import BinanceSpotGateway
 from vnpy.trader.object import SubscribeRequest, OrderRequest, Direction, Offset, OrderType, LogData, BarData, CancelRequest, TickData, OrderData, TradeData
 from vnpy.trader.constant import Exchange, Interval, Status
-from vnpy.event import Event
+from vnpy.event import Event, EventEngine
 from vnpy.trader.event import EVENT_CONTRACT, EVENT_ACCOUNT, EVENT_LOG, EVENT_POSITION, EVENT_TRADE, EVENT_ORDER, EVENT_TICK
 from vnpy.trader.setting import SETTINGS
 from vnpy.trader.database import get_database
@@ -16,12 +22,12 @@ import json
 from pathlib import Path
 from vnpy_ctastrategy.backtesting import BacktestingEngine
 from src.strategies.trading_strategy import MediumFrequencyStrategy
+from src._njit import njit
 import pandas as pd
 from datetime import datetime, timedelta
-import random
 import numpy as np  # 添加numpy用于统计计算
-import math
-from typing import Optional, List, Dict, Any, Callable
+from typing import Optional, List, Dict, Any, Callable, Final
+from dataclasses import dataclass
 
 # 禁止Qt输出警告和错误信息
 os.environ["QT_LOGGING_RULES"] = "*=false"
@@ -36,13 +42,54 @@ SETTINGS["log.active"] = True
 SETTINGS["log.level"] = logging.INFO
 SETTINGS["log.console"] = True
 
+# 事件回调中使用的日志开关，启动时读取一次，避免每个事件都查询SETTINGS
+_LOG_CONSOLE = SETTINGS["log.console"]
+_LOG_LEVEL = SETTINGS["log.level"]
+# INFO级别的GUI日志是否会被显示，为False时调用方跳过消息格式化
+_LOG_INFO_ENABLED = _LOG_LEVEL <= logging.INFO
+
+def _put_log(event_engine, level, gateway_name, fmt, *args):
+    """向GUI发送日志事件，级别低于_LOG_LEVEL时直接返回，不构造消息字符串和LogData"""
+    if level < _LOG_LEVEL:
+        return
+    log_data = LogData(msg=fmt % args if args else fmt, level=level, gateway_name=gateway_name)
+    event_engine.put(Event(EVENT_LOG, log_data))
+
+class _BatchFileHandler(logging.FileHandler):
+    """写入每条日志后不立即flush，由日志线程在队列清空时统一flush，一批日志只落一次盘"""
+    
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+class _BatchQueueListener(logging.handlers.QueueListener):
+    """批量消费日志队列：队列中还有日志时连续写入，取空后flush一次再阻塞等待"""
+    
+    def dequeue(self, block):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            for handler in self.handlers:
+                handler.flush()
+            return self.queue.get(block)
+
 # 添加文件日志处理器，使用固定文件名，追加模式
 log_file = os.path.join(logs_dir, "trading_log.log")
-file_handler = logging.FileHandler(log_file, encoding='utf-8', mode='a')  # 使用追加模式
+file_handler = _BatchFileHandler(log_file, encoding='utf-8', mode='a')  # 使用追加模式
 file_handler.setLevel(logging.INFO)
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 file_handler.setFormatter(formatter)
-logging.getLogger().addHandler(file_handler)
+
+# 文件写入交给后台QueueListener线程，调用logging的线程（包括事件引擎线程）只负责入队
+_log_record_q = queue.Queue(-1)
+logging.getLogger().addHandler(logging.handlers.QueueHandler(_log_record_q))
+_log_listener = _BatchQueueListener(_log_record_q, file_handler, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 print(f"日志文件路径: {log_file} (追加模式)")
 
 # 配置数据库（必须在创建MainEngine之前）
@@ -73,45 +120,179 @@ except ImportError:
     print("Warning: pymongo not installed, using SQLite instead")
     SETTINGS["database.driver"] = "sqlite"
 
+# 控制台日志队列：回调中只入队，由后台线程批量写出，避免print阻塞行情和订单回调
+# 使用有界deque，输出跟不上时丢弃最旧的消息
+class _ConsoleLogQueue(collections.deque):
+    """入队时唤醒后台日志线程的deque，队列空闲时日志线程阻塞等待"""
+    __slots__ = ("ready",)
+
+    def __init__(self, maxlen):
+        super().__init__(maxlen=maxlen)
+        self.ready = threading.Event()
+
+    def append(self, msg):
+        super().append(msg)
+        if not self.ready.is_set():
+            self.ready.set()
+
+_log_q = _ConsoleLogQueue(maxlen=10000)
+_log_flush_lock = threading.Lock()  # 仅在消费端使用，保证退出时的flush与后台线程互斥
+
+def _flush_console_log(max_batch=256):
+    """将队列中的控制台日志批量写出到stdout，返回写出的条数"""
+    written = 0
+    with _log_flush_lock:
+        while _log_q:
+            batch = []
+            while _log_q and len(batch) < max_batch:
+                batch.append(_log_q.popleft())
+            sys.stdout.write("\n".join(batch) + "\n")
+            written += len(batch)
+        if written:
+            sys.stdout.flush()
+    return written
+
+def _drain_console_log():
+    """后台日志线程，有新日志入队时被唤醒并清空控制台日志队列"""
+    ready = _log_q.ready
+    while True:
+        ready.wait()
+        # 先清除标志再写出，写出期间入队的日志会重新置位，不会丢失唤醒
+        ready.clear()
+        _flush_console_log()
+
+threading.Thread(target=_drain_console_log, name="ConsoleLogger", daemon=True).start()
+atexit.register(_flush_console_log)
+
+# 逐条行情/委托/成交的调试输出，设置环境变量 TRADER_VERBOSE=1 时开启
+VERBOSE = os.environ.get("TRADER_VERBOSE") == "1"
+
+def _dbg(fmt, *args):
+    """输出调试信息到控制台队列，未开启VERBOSE时直接返回，不格式化消息"""
+    if __debug__ and VERBOSE:
+        _log_q.append(fmt % args if args else fmt)
+
+# 持仓数据序列化：优先使用orjson（浮点数据序列化更快），未安装时回退到标准库json
+try:
+    import orjson
+    
+    def _dumps(data):
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _dumps(data):
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+# 持仓文件的打开方式：二进制写入，O_DSYNC使每次写入直接落盘，不支持的平台上为0
+_SAVE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0) | getattr(os, "O_DSYNC", 0)
+
+def _write_file(path, data):
+    """用一次打开、os.write直接写入字节数据，处理部分写入的情况"""
+    fd = os.open(path, _SAVE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
 # 创建一个全局的持仓跟踪器
 global_position_tracker = None
 
-# 添加一个全局变量控制策略线程
-strategy_running = True
+# 添加一个全局事件控制策略线程，置位后策略线程退出
+strategy_stop_event = threading.Event()
+
+# 活跃订单索引 vt_orderid -> OrderData，由on_order维护，供check_order_status常数时间查询
+_ACTIVE_STATUSES: Final = frozenset({Status.SUBMITTING, Status.NOTTRADED, Status.PARTTRADED})
+# 委托结束状态（vnpy的Status没有EXPIRED）
+_TERMINAL_STATUSES: Final = frozenset({Status.ALLTRADED, Status.CANCELLED, Status.REJECTED})
+_active_orders: Dict[str, OrderData] = {}
+
+class RecordRingBuffer:
+    """定长环形缓冲区，按列(SoA)存储订单/成交记录，写满后覆盖最旧的记录"""
+    
+    __slots__ = ("capacity", "price", "volume", "sign", "ts", "order_id", "slot_of", "_live_slots", "head", "n")
+    
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.price = np.empty(capacity, dtype=np.float64)
+        self.volume = np.empty(capacity, dtype=np.float64)
+        self.sign = np.empty(capacity, dtype=np.int8)  # 买入为+1，卖出为-1
+        self.ts = np.empty(capacity, dtype=np.int64)  # 记录时间(单调时钟纳秒)
+        self.order_id = np.empty(capacity, dtype=object)
+        self.slot_of: Dict[str, int] = {}  # order_id -> 槽位，同一订单多次记录时指向仍在缓冲区中的最早一条
+        self._live_slots: Dict[str, collections.deque] = {}  # order_id -> 该订单仍在缓冲区中的槽位，按写入先后排列
+        self.head = 0  # 下一个写入位置
+        self.n = 0  # 有效记录数
+    
+    def __len__(self):
+        return self.n
+    
+    def __contains__(self, order_id):
+        return order_id in self.slot_of
+    
+    def append(self, price, sign, volume, order_id):
+        """写入一条记录"""
+        slot = self.head
+        
+        # 覆盖旧记录前更新其索引：被覆盖的总是全局最旧的记录，也就是该订单最早的一条，
+        # 同一订单还有更新的记录时改指向下一条，否则删除
+        if self.n == self.capacity:
+            old_id = self.order_id[slot]
+            live = self._live_slots[old_id]
+            live.popleft()
+            if live:
+                self.slot_of[old_id] = live[0]
+            else:
+                del self.slot_of[old_id]
+                del self._live_slots[old_id]
+        else:
+            self.n += 1
+        
+        self.price[slot] = price
+        self.volume[slot] = volume
+        self.sign[slot] = sign
+        self.ts[slot] = time.monotonic_ns()
+        self.order_id[slot] = order_id
+        live = self._live_slots.get(order_id)
+        if live is None:
+            self._live_slots[order_id] = collections.deque((slot,))
+            self.slot_of[order_id] = slot
+        else:
+            live.append(slot)
+        
+        self.head = (slot + 1) % self.capacity
+
+def direction_sign(direction):
+    """将方向转换为符号，买入为+1，卖出为-1"""
+    return 1 if direction == Direction.LONG or direction == "多" else -1
 
 # 添加一个简单的手动TCA分析器
 class SimpleTCA:
     """简单的交易成本分析器，手动记录订单和成交数据"""
     
-    def __init__(self, analysis_interval=5):
+    __slots__ = ("order_records", "trade_records", "analysis_interval", "trade_count")
+    
+    def __init__(self, analysis_interval=5, capacity=4096):
         """初始化分析器"""
-        self.order_records = []  # 订单记录 [时间, 价格, 方向, 数量, 订单ID]
-        self.trade_records = []  # 成交记录 [时间, 价格, 方向, 数量, 订单ID]
+        self.order_records = RecordRingBuffer(capacity)  # 订单记录 [时间, 价格, 方向, 数量, 订单ID]
+        self.trade_records = RecordRingBuffer(capacity)  # 成交记录 [时间, 价格, 方向, 数量, 订单ID]
         self.analysis_interval = analysis_interval
         self.trade_count = 0
     
     def record_order(self, price, direction, volume, order_id):
         """记录订单"""
-        self.order_records.append({
-            "time": datetime.now(),
-            "price": price,
-            "direction": direction,
-            "volume": volume,
-            "order_id": order_id
-        })
-        print(f"TCA: 记录订单 {order_id}, 价格: {price}, 方向: {direction}")
+        self.order_records.append(price, direction_sign(direction), volume, order_id)
+        _dbg("TCA: 记录订单 %s, 价格: %s, 方向: %s", order_id, price, direction)
+    
+    def has_order(self, order_id):
+        """是否已记录该订单，通过订单号索引常数时间查询"""
+        return order_id in self.order_records.slot_of
     
     def record_trade(self, price, direction, volume, order_id):
         """记录成交"""
-        self.trade_records.append({
-            "time": datetime.now(),
-            "price": price,
-            "direction": direction,
-            "volume": volume,
-            "order_id": order_id
-        })
+        self.trade_records.append(price, direction_sign(direction), volume, order_id)
         self.trade_count += 1
-        print(f"TCA: 记录成交 {order_id}, 价格: {price}, 方向: {direction}")
+        _dbg("TCA: 记录成交 %s, 价格: %s, 方向: %s", order_id, price, direction)
         
         # 每N笔交易分析一次
         if self.trade_count % self.analysis_interval == 0:
@@ -126,56 +307,50 @@ class SimpleTCA:
         print("\n=== 交易成本分析 ===")
         analysis_results = ["\n=== 手动交易成本分析(TCA) ==="]
         
-        # 计算滑点
-        slippage_list = []  # 实际滑点
-        slippage_percent_list = []  # 百分比滑点
-        trade_delay_list = []  # 交易延迟(ms)
+        orders = self.order_records
+        trades = self.trade_records
+        n = trades.n
         
-        for trade in self.trade_records:
-            # 查找对应的订单
-            matching_orders = [o for o in self.order_records if o["order_id"] == trade["order_id"]]
-            if not matching_orders:
-                continue
-                
-            order = matching_orders[0]
-            
-            # 计算滑点 (成交价格 - 订单价格)
-            if trade["direction"] == Direction.LONG or trade["direction"] == "多":
-                # 买入，成交价减去订单价，正值表示不利滑点
-                slippage = trade["price"] - order["price"]
-            else:
-                # 卖出，订单价减去成交价，正值表示不利滑点
-                slippage = order["price"] - trade["price"]
-                
-            slippage_list.append(slippage)
-            
-            # 计算百分比滑点
-            if order["price"] > 0:
-                slippage_percent = (slippage / order["price"]) * 100
-                slippage_percent_list.append(slippage_percent)
-            
-            # 计算交易延迟
-            if "time" in trade and "time" in order:
-                delay_ms = (trade["time"] - order["time"]).total_seconds() * 1000
-                trade_delay_list.append(delay_ms)
+        # 通过订单ID索引找到每笔成交对应的订单槽位，找不到的记为-1
+        order_slot = np.fromiter(
+            (orders.slot_of.get(oid, -1) for oid in trades.order_id[:n]),
+            dtype=np.int64,
+            count=n
+        )
+        matched = order_slot >= 0
+        order_slot = order_slot[matched]
+        
+        # 对齐订单与成交数据，整体向量化计算
+        order_price = orders.price[order_slot]
+        trade_price = trades.price[:n][matched]
+        
+        # 计算滑点 (成交价格 - 订单价格)，正值始终表示不利滑点
+        slippage = trades.sign[:n][matched] * (trade_price - order_price)  # 实际滑点
+        
+        # 计算百分比滑点
+        valid = order_price > 0
+        slippage_pct = slippage[valid] / order_price[valid] * 100  # 百分比滑点
+        
+        # 计算交易延迟(ms)
+        trade_delay = (trades.ts[:n][matched] - orders.ts[order_slot]) * 1e-6
         
         # 滑点分析
-        if slippage_list:
-            avg_slippage = sum(slippage_list) / len(slippage_list)
-            max_slippage = max(slippage_list)
-            min_slippage = min(slippage_list)
+        if slippage.size:
+            avg_slippage = float(slippage.mean())
+            max_slippage = float(slippage.max())
+            min_slippage = float(slippage.min())
             
-            # 标准差计算
-            std_slippage = math.sqrt(sum((x - avg_slippage) ** 2 for x in slippage_list) / len(slippage_list)) if len(slippage_list) > 1 else 0
+            # 标准差计算（总体标准差，单次向量化计算）
+            std_slippage = float(slippage.std()) if slippage.size > 1 else 0.0
             
-            print(f"滑点分析 (共{len(slippage_list)}笔交易):")
+            print(f"滑点分析 (共{len(slippage)}笔交易):")
             print(f"  平均滑点: {avg_slippage:.8f}")
             print(f"  最大滑点: {max_slippage:.8f}")
             print(f"  最小滑点: {min_slippage:.8f}")
             print(f"  滑点标准差: {std_slippage:.8f}")
             
             analysis_results.extend([
-                f"📉 滑点分析 (共{len(slippage_list)}笔交易):",
+                f"📉 滑点分析 (共{len(slippage)}笔交易):",
                 f"  平均滑点: {avg_slippage:.8f}",
                 f"  最大滑点: {max_slippage:.8f}",
                 f"  最小滑点: {min_slippage:.8f}",
@@ -183,10 +358,10 @@ class SimpleTCA:
             ])
             
             # 百分比滑点
-            if slippage_percent_list:
-                avg_pct = sum(slippage_percent_list) / len(slippage_percent_list)
-                max_pct = max(slippage_percent_list)
-                min_pct = min(slippage_percent_list)
+            if slippage_pct.size:
+                avg_pct = float(slippage_pct.mean())
+                max_pct = float(slippage_pct.max())
+                min_pct = float(slippage_pct.min())
                 
                 print(f"相对滑点百分比:")
                 print(f"  平均滑点百分比: {avg_pct:.6f}%")
@@ -201,18 +376,18 @@ class SimpleTCA:
                 ])
         
         # 交易延迟分析
-        if trade_delay_list:
-            avg_delay = sum(trade_delay_list) / len(trade_delay_list)
-            max_delay = max(trade_delay_list)
-            min_delay = min(trade_delay_list)
+        if trade_delay.size:
+            avg_delay = float(trade_delay.mean())
+            max_delay = float(trade_delay.max())
+            min_delay = float(trade_delay.min())
             
-            print(f"交易延迟分析 (共{len(trade_delay_list)}笔交易):")
+            print(f"交易延迟分析 (共{len(trade_delay)}笔交易):")
             print(f"  平均延迟: {avg_delay:.2f}ms")
             print(f"  最大延迟: {max_delay:.2f}ms")
             print(f"  最小延迟: {min_delay:.2f}ms")
             
             analysis_results.extend([
-                f"⏱️ 交易延迟分析 (共{len(trade_delay_list)}笔交易):",
+                f"⏱️ 交易延迟分析 (共{len(trade_delay)}笔交易):",
                 f"  平均延迟: {avg_delay:.2f}ms",
                 f"  最大延迟: {max_delay:.2f}ms",
                 f"  最小延迟: {min_delay:.2f}ms"
@@ -240,9 +415,48 @@ class SimpleTCA:
                 
         return analysis_results
 
+@functools.lru_cache(maxsize=256)
+def _parse_vt_symbol(vt_symbol):
+    """将vt_symbol解析为(小写交易对, 交易所)，没有交易所后缀时默认为BINANCE，结果按vt_symbol缓存"""
+    if "." in vt_symbol:
+        symbol, exchange_str = vt_symbol.split(".")
+        return symbol.lower(), Exchange(exchange_str)
+    return vt_symbol.lower(), Exchange.BINANCE
+
+# 收盘价环形缓冲区容量
+MAX_BARS = 1024
+
+# 下单时使用的枚举常量，避免每次下单都做枚举属性查找
+_LONG = Direction.LONG
+_SHORT = Direction.SHORT
+_OPEN = Offset.OPEN
+_CLOSE = Offset.CLOSE
+_LIMIT = OrderType.LIMIT
+
+@njit(cache=True, fastmath=True)
+def compute_signal(closes, n, window):
+    """计算最近window根K线的均价和当前价格偏离百分比，closes为环形缓冲区，n为已写入的K线总数"""
+    cap = closes.shape[0]
+    avg = 0.0
+    for i in range(n - window, n):
+        avg += closes[i % cap]
+    avg /= window
+    cur = closes[(n - 1) % cap]
+    return avg, (cur - avg) / avg * 100.0
+
 class SimpleStrategy:
     """简单策略，只读取和打印市场数据，不做复杂的交易决策"""
     
+    # 固定属性集合，省去实例__dict__，加快on_tick/on_bar中的属性访问
+    __slots__ = (
+        "name", "vt_symbol", "pos", "trading", "inited", "main_engine",
+        "symbol", "exchange", "_gateway_name",
+        "closes", "nbars", "signal_window", "bars", "tick_count",
+        "_bar_dt", "_bar_open", "_bar_high", "_bar_low", "_bar_close",
+        "_bar_volume", "_bar_turnover", "_last_tick_volume", "_last_tick_turnover",
+        "last_signal_ns", "signal_interval_ns", "order_volume",
+    )
+    
     def __init__(self, name="SimpleStrategy", symbol="btcusdt.BINANCE", main_engine=None):
         self.name = name
         self.vt_symbol = symbol
@@ -253,21 +467,36 @@ class SimpleStrategy:
         # 添加main_engine引用，用于发送订单
         self.main_engine = main_engine
         
-        # 解析交易对信息
-        if "." in symbol:
-            self.symbol, exchange_str = symbol.split(".")
-            self.exchange = Exchange(exchange_str)
-        else:
-            self.symbol = symbol
-            self.exchange = Exchange.BINANCE
+        # 解析交易对信息，交易对统一为小写，下单时可直接使用
+        self.symbol, self.exchange = _parse_vt_symbol(symbol)
+        
+        # 下单用的网关名在策略生命周期内不变，只计算一次
+        self._gateway_name = self.exchange.value + "_SPOT"
             
-        # K线数据管理器，用于暂存接收到的数据
-        self.bars = []
-        self.ticks = []
+        # 收盘价环形缓冲区，供信号计算使用
+        self.closes = np.empty(MAX_BARS, dtype=np.float64)
+        self.nbars = 0
+        self.signal_window = 3  # 使用最近3条K线计算均价
+        
+        # 只保留最近几条K线，Tick只计数，避免长时间运行时内存持续增长
+        self.bars = collections.deque(maxlen=max(self.signal_window, 8))
+        self.tick_count = 0
+        
+        # 正在合成的分钟K线，由Tick增量更新，跨分钟时才生成BarData
+        self._bar_dt = None  # 当前K线所属分钟，None表示尚未收到Tick
+        self._bar_open = 0.0
+        self._bar_high = 0.0
+        self._bar_low = 0.0
+        self._bar_close = 0.0
+        self._bar_volume = 0.0
+        self._bar_turnover = 0.0
+        # 行情推送的成交量/成交额为累计值，按与上一个Tick的差值累加到K线
+        self._last_tick_volume = None
+        self._last_tick_turnover = 0.0
         
         # 控制交易信号频率
-        self.last_signal_time = None
-        self.signal_interval = 10  # 秒，每10秒最多一个信号
+        self.last_signal_ns = 0  # 0 表示尚未产生过信号
+        self.signal_interval_ns = 10_000_000_000  # 纳秒，每10秒最多一个信号
         
         # 交易参数
         self.order_volume = 0.01  # 每次交易0.01个比特币（原来是0.001）
@@ -303,119 +532,152 @@ class SimpleStrategy:
     
     def on_tick(self, tick):
         """接收Tick数据"""
-        self.ticks.append(tick)
-        
-        # 只有重要的tick数据才打印，减少控制台输出
-        # 这里设置为每100个tick才输出一次
-        if len(self.ticks) % 100 == 0:
-            print(f"{self.name}: 收到第 {len(self.ticks)} 个Tick: {tick.symbol}, 价格: {tick.last_price}")
+        self.tick_count += 1
+        _dbg("%s: 收到第 %d 个Tick: %s, 价格: %s", self.name, self.tick_count, tick.symbol, tick.last_price)
+    
+    def update_bar(self, tick):
+        """用Tick增量合成分钟K线，进入新的一分钟时返回已完成的上一根K线，否则返回None"""
+        price = tick.last_price
+        # 按整分钟比较，只比较分钟字段会把相隔整小时/整天的同一分钟合并成一根K线
+        bar_dt = tick.datetime.replace(second=0, microsecond=0)
+        bar = None
+        
+        if bar_dt != self._bar_dt:
+            if self._bar_dt is not None:
+                bar = BarData(
+                    symbol=tick.symbol,
+                    exchange=tick.exchange,
+                    datetime=self._bar_dt,
+                    interval=Interval.MINUTE,
+                    open_price=self._bar_open,
+                    high_price=self._bar_high,
+                    low_price=self._bar_low,
+                    close_price=self._bar_close,
+                    volume=self._bar_volume,
+                    turnover=self._bar_turnover,
+                    gateway_name=tick.gateway_name
+                )
+            
+            # 开始新的一根K线
+            self._bar_dt = bar_dt
+            self._bar_open = self._bar_high = self._bar_low = price
+            self._bar_volume = 0.0
+            self._bar_turnover = 0.0
+        elif price > self._bar_high:
+            self._bar_high = price
+        elif price < self._bar_low:
+            self._bar_low = price
+        self._bar_close = price
+        
+        if self._last_tick_volume is not None:
+            self._bar_volume += max(tick.volume - self._last_tick_volume, 0.0)
+            self._bar_turnover += max(tick.turnover - self._last_tick_turnover, 0.0)
+        self._last_tick_volume = tick.volume
+        self._last_tick_turnover = tick.turnover
+        
+        return bar
     
     def on_bar(self, bar):
         """接收K线数据"""
         # 限制打印频率，每10根K线打印一次
-        should_print = len(self.bars) % 10 == 0
+        should_print = self.nbars % 10 == 0
         
         self.bars.append(bar)
+        self.closes[self.nbars % MAX_BARS] = bar.close_price
+        self.nbars += 1
         if should_print:
-            print(f"\n===> {self.name}: 收到K线: {bar.symbol}, 价格: {bar.close_price}, 时间: {bar.datetime}")
+            _log_q.append(f"\n===> {self.name}: 收到K线: {bar.symbol}, 价格: {bar.close_price}, 时间: {bar.datetime}")
         
         # 确保至少有3条K线数据才开始生成信号
-        if len(self.bars) < 3:
+        if self.nbars < self.signal_window:
             if should_print:
-                print(f"K线数量不足，当前: {len(self.bars)}/3 条")
+                _log_q.append(f"K线数量不足，当前: {self.nbars}/{self.signal_window} 条")
             return
             
         # 控制信号频率 - 检查距离上次信号是否已经过了指定时间
-        current_time = datetime.now()
-        if self.last_signal_time and (current_time - self.last_signal_time).total_seconds() < self.signal_interval:
+        now_ns = time.monotonic_ns()
+        if self.last_signal_ns and now_ns - self.last_signal_ns < self.signal_interval_ns:
             if should_print:
-                seconds_passed = (current_time - self.last_signal_time).total_seconds()
-                seconds_remaining = self.signal_interval - seconds_passed
-                print(f"信号间隔限制，需再等待 {seconds_remaining:.1f} 秒")
+                seconds_remaining = (self.signal_interval_ns - (now_ns - self.last_signal_ns)) * 1e-9
+                _log_q.append(f"信号间隔限制，需再等待 {seconds_remaining:.1f} 秒")
             return
         
-        # 生成交易信号 - 使用更少的K线来计算平均价格
-        latest_bars = self.bars[-3:]  # 只使用最近3条K线
-        prices = [b.close_price for b in latest_bars]
-        avg_price = sum(prices) / len(prices)
-        
-        # 计算价格偏离百分比
+        # 生成交易信号 - 使用最近3条K线的均价计算价格偏离百分比
+        avg_price, price_diff_percent = compute_signal(self.closes, self.nbars, self.signal_window)
         current_price = bar.close_price
-        price_diff_percent = (current_price - avg_price) / avg_price * 100
         
         # 打印每次K线的计算结果 (更频繁地打印)
-        if should_print or len(self.bars) % 3 == 0:
-            print(f"\n*** 价格分析 ***")
-            print(f"最近3条K线均价: {avg_price:.2f}, 当前价格: {current_price:.2f}")
-            print(f"价格偏离: {price_diff_percent:.6f}% (阈值: 任何非零偏离)")
+        if should_print or self.nbars % 3 == 0:
+            _log_q.append(f"\n*** 价格分析 ***")
+            _log_q.append(f"最近3条K线均价: {avg_price:.2f}, 当前价格: {current_price:.2f}")
+            _log_q.append(f"价格偏离: {price_diff_percent:.6f}% (阈值: 任何非零偏离)")
             
             # 打印交易条件是否满足
             if current_price > avg_price:
-                print(f"价格高于均线 ↑ (当前持仓: {self.pos})")
+                _log_q.append(f"价格高于均线 ↑ (当前持仓: {self.pos})")
                 if price_diff_percent > 0.00000 and self.pos <= 0:
-                    print(f"✅ 买入条件满足! 价格比均线高 {current_price - avg_price:.8f}")
+                    _log_q.append(f"✅ 买入条件满足! 价格比均线高 {current_price - avg_price:.8f}")
                 else:
                     reason = "当前已有多头持仓" if self.pos > 0 else "价格偏离为0"
-                    print(f"❌ 买入条件不满足: {reason}")
+                    _log_q.append(f"❌ 买入条件不满足: {reason}")
             else:
-                print(f"价格低于均线 ↓ (当前持仓: {self.pos})")
+                _log_q.append(f"价格低于均线 ↓ (当前持仓: {self.pos})")
                 if price_diff_percent < 0.00000 and self.pos >= 0:
-                    print(f"✅ 卖出条件满足! 价格比均线低 {avg_price - current_price:.8f}")
+                    _log_q.append(f"✅ 卖出条件满足! 价格比均线低 {avg_price - current_price:.8f}")
                 else:
                     reason = "当前已有空头持仓" if self.pos < 0 else "价格偏离为0"
-                    print(f"❌ 卖出条件不满足: {reason}")
+                    _log_q.append(f"❌ 卖出条件不满足: {reason}")
         
         # 几乎所有的价格偏离都会产生信号
         if price_diff_percent > 0.00000 and self.pos <= 0:
-            print(f"\n========================")
-            print(f"🔴 {self.name}: 生成买入信号!!!")
-            print(f"均价: {avg_price:.2f}, 当前价: {current_price:.2f}")
-            print(f"偏离: +{price_diff_percent:.6f}% ({current_price - avg_price:.8f})")
-            print(f"========================\n")
+            _log_q.append(f"\n========================")
+            _log_q.append(f"🔴 {self.name}: 生成买入信号!!!")
+            _log_q.append(f"均价: {avg_price:.2f}, 当前价: {current_price:.2f}")
+            _log_q.append(f"偏离: +{price_diff_percent:.6f}% ({current_price - avg_price:.8f})")
+            _log_q.append(f"========================\n")
             
             # 实际发送买入订单
             order_id = self.send_buy_order(current_price)
             
-            self.last_signal_time = current_time
+            self.last_signal_ns = now_ns
             self.pos = 1  # 模拟持仓变化
                 
         elif price_diff_percent < 0.00000 and self.pos >= 0:
-            print(f"\n========================")
-            print(f"🔵 {self.name}: 生成卖出信号!!!")
-            print(f"均价: {avg_price:.2f}, 当前价: {current_price:.2f}")
-            print(f"偏离: {price_diff_percent:.6f}% ({current_price - avg_price:.8f})")
-            print(f"========================\n")
+            _log_q.append(f"\n========================")
+            _log_q.append(f"🔵 {self.name}: 生成卖出信号!!!")
+            _log_q.append(f"均价: {avg_price:.2f}, 当前价: {current_price:.2f}")
+            _log_q.append(f"偏离: {price_diff_percent:.6f}% ({current_price - avg_price:.8f})")
+            _log_q.append(f"========================\n")
             
             # 实际发送卖出订单
             order_id = self.send_sell_order(current_price)
             
-            self.last_signal_time = current_time
+            self.last_signal_ns = now_ns
             self.pos = -1  # 模拟持仓变化
 
     def send_buy_order(self, price):
         """发送买入订单"""
         if not self.main_engine:
-            print("⚠️ 无法发送订单: main_engine未设置")
+            _log_q.append("⚠️ 无法发送订单: main_engine未设置")
             return
             
         # 检查资金是否充足，使用自定义持仓跟踪器
         global global_position_tracker
         if not global_position_tracker:
-            print("⚠️ 无法获取自定义持仓跟踪器，取消买入")
+            _log_q.append("⚠️ 无法获取自定义持仓跟踪器，取消买入")
             return
             
         required_funds = price * self.order_volume
         
         if not global_position_tracker.has_enough_balance(required_funds):
-            print(f"⚠️ 资金不足: 需要 {required_funds}, 可用 {global_position_tracker.get_available_balance()}, 取消买入")
+            _log_q.append(f"⚠️ 资金不足: 需要 {required_funds}, 可用 {global_position_tracker.get_available_balance()}, 取消买入")
             
             # 手动记录日志到GUI
-            log_data = LogData(
-                msg=f"⚠️ 资金不足: 需要 {required_funds:.6f}, 可用 {global_position_tracker.get_available_balance():.6f}, 取消买入操作",
-                level=logging.WARNING,
-                gateway_name="SYSTEM"
+            _put_log(
+                self.main_engine.event_engine, logging.WARNING, "SYSTEM",
+                "⚠️ 资金不足: 需要 %.6f, 可用 %.6f, 取消买入操作",
+                required_funds, global_position_tracker.get_available_balance()
             )
-            self.main_engine.event_engine.put(Event(EVENT_LOG, log_data))
             return
         
         # 冻结资金
@@ -423,155 +685,152 @@ class SimpleStrategy:
             
         # 创建买单
         order_req = OrderRequest(
-            symbol=self.symbol.lower(),  # 注意：symbol必须小写
+            symbol=self.symbol,  # 注意：symbol必须小写
             exchange=self.exchange,
-            direction=Direction.LONG,  # 买入
-            offset=Offset.OPEN,  # 开仓
-            type=OrderType.LIMIT,  # 限价单
+            direction=_LONG,  # 买入
+            offset=_OPEN,  # 开仓
+            type=_LIMIT,  # 限价单
             price=price,  # 使用传入的价格
             volume=self.order_volume,  # 使用设定的交易量
         )
-        print(f"📤 发送买入订单: {self.symbol}, 价格: {price}, 数量: {self.order_volume}")
-        vt_orderid = self.main_engine.send_order(order_req, self.exchange.value + "_SPOT")
-        print(f"📋 订单已发送, vt_orderid: {vt_orderid}")
+        _log_q.append(f"📤 发送买入订单: {self.symbol}, 价格: {price}, 数量: {self.order_volume}")
+        vt_orderid = self.main_engine.send_order(order_req, self._gateway_name)
+        _log_q.append(f"📋 订单已发送, vt_orderid: {vt_orderid}")
         
         # 使用SimpleTCA记录订单
         global global_tca
         if global_tca:
-            global_tca.record_order(price, Direction.LONG, self.order_volume, vt_orderid)
+            global_tca.record_order(price, _LONG, self.order_volume, vt_orderid)
         
         # 手动记录日志到GUI
-        log_data = LogData(
-            msg=f"📤 发送买入订单: {self.symbol}, 价格: {price:.4f}, 数量: {self.order_volume}, ID: {vt_orderid}",
-            level=logging.INFO,
-            gateway_name="TRADE"
+        event_engine = self.main_engine.event_engine
+        _put_log(
+            event_engine, logging.INFO, "TRADE",
+            "📤 发送买入订单: %s, 价格: %.4f, 数量: %s, ID: %s",
+            self.symbol, price, self.order_volume, vt_orderid
         )
-        self.main_engine.event_engine.put(Event(EVENT_LOG, log_data))
         
         # 记录当前资金状态到GUI
-        log_data = LogData(
-            msg=f"💰 当前自管账户: 余额={global_position_tracker.balance:.6f}, 冻结={global_position_tracker.frozen:.6f}, 可用={global_position_tracker.get_available_balance():.6f}",
-            level=logging.INFO,
-            gateway_name="ACCOUNT"
+        _put_log(
+            event_engine, logging.INFO, "ACCOUNT",
+            "💰 当前自管账户: 余额=%.6f, 冻结=%.6f, 可用=%.6f",
+            global_position_tracker.balance, global_position_tracker.frozen, global_position_tracker.get_available_balance()
         )
-        self.main_engine.event_engine.put(Event(EVENT_LOG, log_data))
         
         return vt_orderid
         
     def send_sell_order(self, price):
         """发送卖出订单"""
         if not self.main_engine:
-            print("⚠️ 无法发送订单: main_engine未设置")
+            _log_q.append("⚠️ 无法发送订单: main_engine未设置")
             return
             
         # 检查是否有持仓可卖，使用自定义持仓跟踪器
         global global_position_tracker
         
         if not global_position_tracker:
-            print("⚠️ 无法获取自定义持仓跟踪器，取消卖出")
+            _log_q.append("⚠️ 无法获取自定义持仓跟踪器，取消卖出")
             return
             
         # 检查是否有多头持仓可平仓
-        if not global_position_tracker.has_position_to_sell(self.symbol.lower(), self.order_volume):
-            print(f"⚠️ 持仓不足: 需要 {self.order_volume} 的多头持仓用于卖出，取消卖出")
+        if not global_position_tracker.has_position_to_sell(self.symbol, self.order_volume):
+            _log_q.append(f"⚠️ 持仓不足: 需要 {self.order_volume} 的多头持仓用于卖出，取消卖出")
             
             # 手动记录日志到GUI
-            log_data = LogData(
-                msg=f"⚠️ 持仓不足: 无法卖出 {self.order_volume} {self.symbol}，取消卖出操作",
-                level=logging.WARNING,
-                gateway_name="SYSTEM"
+            event_engine = self.main_engine.event_engine
+            _put_log(
+                event_engine, logging.WARNING, "SYSTEM",
+                "⚠️ 持仓不足: 无法卖出 %s %s，取消卖出操作",
+                self.order_volume, self.symbol
             )
-            self.main_engine.event_engine.put(Event(EVENT_LOG, log_data))
             
             # 记录当前持仓到GUI
             positions = global_position_tracker.get_all_positions()
             if positions:
                 for symbol, pos in positions.items():
-                    log_data = LogData(
-                        msg=f"📊 当前持仓: {symbol}, 方向: {pos.get('direction')}, 数量: {pos.get('volume')}, 价格: {pos.get('price')}",
-                        level=logging.INFO,
-                        gateway_name="POSITION"
+                    _put_log(
+                        event_engine, logging.INFO, "POSITION",
+                        "📊 当前持仓: %s, 方向: %s, 数量: %s, 价格: %s",
+                        symbol, pos.get('direction'), pos.get('volume'), pos.get('price')
                     )
-                    self.main_engine.event_engine.put(Event(EVENT_LOG, log_data))
             else:
-                log_data = LogData(
-                    msg=f"📊 当前无持仓",
-                    level=logging.INFO,
-                    gateway_name="POSITION"
-                )
-                self.main_engine.event_engine.put(Event(EVENT_LOG, log_data))
+                _put_log(event_engine, logging.INFO, "POSITION", "📊 当前无持仓")
             
             return
             
         # 创建卖单
         order_req = OrderRequest(
-            symbol=self.symbol.lower(),  # 注意：symbol必须小写
+            symbol=self.symbol,  # 注意：symbol必须小写
             exchange=self.exchange,
-            direction=Direction.SHORT,  # 卖出
-            offset=Offset.CLOSE,  # 平仓
-            type=OrderType.LIMIT,  # 限价单
+            direction=_SHORT,  # 卖出
+            offset=_CLOSE,  # 平仓
+            type=_LIMIT,  # 限价单
             price=price,  # 使用传入的价格
             volume=self.order_volume,  # 使用设定的交易量
         )
-        print(f"📤 发送卖出订单: {self.symbol}, 价格: {price}, 数量: {self.order_volume}")
-        vt_orderid = self.main_engine.send_order(order_req, self.exchange.value + "_SPOT")
-        print(f"📋 订单已发送, vt_orderid: {vt_orderid}")
+        _log_q.append(f"📤 发送卖出订单: {self.symbol}, 价格: {price}, 数量: {self.order_volume}")
+        vt_orderid = self.main_engine.send_order(order_req, self._gateway_name)
+        _log_q.append(f"📋 订单已发送, vt_orderid: {vt_orderid}")
         
         # 使用SimpleTCA记录订单
         global global_tca
         if global_tca:
-            global_tca.record_order(price, Direction.SHORT, self.order_volume, vt_orderid)
+            global_tca.record_order(price, _SHORT, self.order_volume, vt_orderid)
         
         # 手动记录日志到GUI
-        log_data = LogData(
-            msg=f"📤 发送卖出订单: {self.symbol}, 价格: {price:.4f}, 数量: {self.order_volume}, ID: {vt_orderid}",
-            level=logging.INFO,
-            gateway_name="TRADE"
+        event_engine = self.main_engine.event_engine
+        _put_log(
+            event_engine, logging.INFO, "TRADE",
+            "📤 发送卖出订单: %s, 价格: %.4f, 数量: %s, ID: %s",
+            self.symbol, price, self.order_volume, vt_orderid
         )
-        self.main_engine.event_engine.put(Event(EVENT_LOG, log_data))
         
         # 记录当前持仓到GUI
         positions = global_position_tracker.get_all_positions()
         if positions:
             for symbol, pos in positions.items():
-                log_data = LogData(
-                    msg=f"📊 当前持仓: {symbol}, 方向: {pos.get('direction')}, 数量: {pos.get('volume')}, 价格: {pos.get('price')}",
-                    level=logging.INFO,
-                    gateway_name="POSITION"
+                _put_log(
+                    event_engine, logging.INFO, "POSITION",
+                    "📊 当前持仓: %s, 方向: %s, 数量: %s, 价格: %s",
+                    symbol, pos.get('direction'), pos.get('volume'), pos.get('price')
                 )
-                self.main_engine.event_engine.put(Event(EVENT_LOG, log_data))
         
         return vt_orderid
 
-def on_contract(event: Event):
-    #print("Contracts loaded, gateway connected.")
-    pass
-
 def on_account(event: Event):
     """处理账户更新事件 - 仅记录日志，不影响自维护的资金管理"""
+    if not _LOG_CONSOLE:
+        return
     account = event.data
-    print(f"收到账户更新事件 (仅记录，不使用): ID={account.accountid}, Balance={account.balance}, Frozen={account.frozen}")
+    _log_q.append(f"收到账户更新事件 (仅记录，不使用): ID={account.accountid}, Balance={account.balance}, Frozen={account.frozen}")
     
     # 输出自维护的资金状态作为对比
-    global global_position_tracker
-    if global_position_tracker:
-        print(f"💰 自维护资金: 余额={global_position_tracker.balance:.6f}, 冻结={global_position_tracker.frozen:.6f}, 可用={global_position_tracker.get_available_balance():.6f}")
+    tracker = global_position_tracker
+    if tracker:
+        _log_q.append(f"💰 自维护资金: 余额={tracker.balance:.6f}, 冻结={tracker.frozen:.6f}, 可用={tracker.get_available_balance():.6f}")
+
+@functools.lru_cache(maxsize=64)
+def _get_logger(name):
+    """按网关名缓存logger，日志事件来源只有少数几个网关"""
+    return logging.getLogger(name)
 
 def on_log(event: Event):
     """处理日志事件"""
     log = event.data
     # 打印到控制台
-    print(f"Log: {log.msg}")
+    if _LOG_CONSOLE:
+        _log_q.append(f"Log: {log.msg}")
     
     # 同时记录到文件
-    log_level = log.level if hasattr(log, 'level') else logging.INFO
-    logger = logging.getLogger(log.gateway_name if hasattr(log, 'gateway_name') else "VNPY")
-    logger.log(log_level, f"{log.msg}")
+    logger = _get_logger(getattr(log, 'gateway_name', "VNPY"))
+    logger.log(getattr(log, 'level', logging.INFO), log.msg)
 
 def on_position(event: Event):
     """持仓更新事件的处理函数 - 仅记录日志，不再用于实际持仓管理"""
+    if not _LOG_CONSOLE:
+        return
     position = event.data
-    print(f"收到持仓事件: Symbol={position.symbol}, Direction={position.direction}, Volume={position.volume} (忽略)")
+    _log_q.append(f"收到持仓事件: Symbol={position.symbol}, Direction={position.direction}, Volume={position.volume} (忽略)")
 
 def calculate_total_assets(main_engine=None):
     """计算账户总资产（使用自维护的数据）"""
@@ -581,15 +840,8 @@ def calculate_total_assets(main_engine=None):
         print("错误: 持仓跟踪器未初始化")
         return 0.0
     
-    # 基础资金
-    total_assets = global_position_tracker.balance
-    
-    # 加上持仓价值
-    positions = global_position_tracker.get_all_positions()
-    for symbol, pos in positions.items():
-        # 获取当前市场价格，或使用持仓价格
-        position_value = pos['volume'] * pos['price']
-        total_assets += position_value
+    # 基础资金加上持仓价值（使用持仓价格估值）
+    total_assets = global_position_tracker.balance + global_position_tracker.get_position_value()
     
     print(f"总资产估值(USDT): {total_assets:.6f}")
     return total_assets
@@ -602,11 +854,10 @@ def print_positions(main_engine):
 
 def check_order_status(main_engine, vt_orderid):
     """检查订单状态"""
-    active_orders = main_engine.get_all_active_orders()
-    for order in active_orders:
-        if order.vt_orderid == vt_orderid:
-            print(f"Order {vt_orderid} status: {order.status}")
-            return order
+    order = _active_orders.get(vt_orderid)
+    if order:
+        print(f"Order {vt_orderid} status: {order.status}")
+        return order
     print(f"Order {vt_orderid} not found in active orders")
     return None
 
@@ -628,27 +879,139 @@ def get_current_price(main_engine, symbol, gateway_name="BINANCE_SPOT"):
 def on_order(event: Event):
     """处理订单更新事件"""
     order = event.data
-    print(f"\n订单更新: {order.vt_orderid}")
-    print(f"状态: {order.status}")
-    print(f"交易对: {order.symbol}")
-    print(f"方向: {order.direction}")
-    print(f"价格: {order.price}")
-    print(f"数量: {order.volume}")
-    print(f"已成交: {order.traded}")
-    print(f"剩余: {order.volume - order.traded}")
-    print(f"创建时间: {order.datetime}")
-    
-    # 使用SimpleTCA记录订单
-    global global_tca
-    if global_tca and hasattr(order, 'price') and hasattr(order, 'direction') and hasattr(order, 'volume') and hasattr(order, 'vt_orderid'):
-        global_tca.record_order(order.price, order.direction, order.volume, order.vt_orderid)
-        print(f"TCA: 记录订单 {order.vt_orderid} 到SimpleTCA")
+    
+    # 维护活跃订单索引
+    if order.status in _ACTIVE_STATUSES:
+        _active_orders[order.vt_orderid] = order
+    else:
+        _active_orders.pop(order.vt_orderid, None)
+    
+    if _LOG_CONSOLE:
+        _log_q.append(
+            f"\n订单更新: {order.vt_orderid}\n"
+            f"状态: {order.status}\n"
+            f"交易对: {order.symbol}\n"
+            f"方向: {order.direction}\n"
+            f"价格: {order.price}\n"
+            f"数量: {order.volume}\n"
+            f"已成交: {order.traded}\n"
+            f"剩余: {order.volume - order.traded}\n"
+            f"创建时间: {order.datetime}"
+        )
+    
+    # 使用SimpleTCA记录订单，订单对象通常具备所需字段，直接访问比逐个hasattr更快
+    tca = global_tca
+    if tca:
+        try:
+            tca.record_order(order.price, order.direction, order.volume, order.vt_orderid)
+        except AttributeError:
+            return
+        _dbg("TCA: 记录订单 %s 到SimpleTCA", order.vt_orderid)
+
+# 持仓数组的初始容量（交易对数量），不够时自动扩容
+MAX_SYMBOLS = 256
+
+# 持仓方向编码：0=无，1=多，2=空，持仓文件中方向仍以"多"/"空"保存
+_DIR_NONE = 0
+_DIR_LONG = 1
+_DIR_SHORT = 2
+_DIR_NAMES = (None, "多", "空")
+_DIR_CODES = {"多": _DIR_LONG, "空": _DIR_SHORT}
+
+@njit(cache=True)
+def _apply_trade(vol, price, dir_code, trade_vol, trade_price, trade_sign):
+    """按一笔成交更新单个持仓，trade_sign买入为+1、卖出为-1，返回新的(数量, 均价, 方向编码)"""
+    # 按带符号持仓量计算，多头为正，空头为负
+    if dir_code == 1:
+        old_qty = vol
+    elif dir_code == 2:
+        old_qty = -vol
+    else:
+        old_qty = 0.0
+    new_qty = old_qty + trade_sign * trade_vol
+    trade_dir = 1 if trade_sign > 0 else 2
+    
+    if old_qty * trade_sign >= 0:
+        # 新开仓或同方向加仓，按成交量加权更新均价
+        if new_qty != 0.0:
+            price = (price * vol + trade_price * trade_vol) / abs(new_qty)
+        else:
+            price = trade_price
+        dir_code = trade_dir
+    elif new_qty * trade_sign >= 0:
+        # 反向成交平掉原持仓，剩余部分按成交价反向开仓，持仓量为0时方向置为无
+        dir_code = trade_dir if new_qty != 0.0 else 0
+        price = trade_price
+    return abs(new_qty), price, dir_code
+
+# 判断持仓变化时忽略的浮点误差
+_VOLUME_EPS = 1e-12
+_PRICE_EPS = 1e-8
+
+def _position_changed(old_position, new_position):
+    """持仓是否有实际变化，忽略浮点误差级别的数量和价格差异"""
+    if not old_position or not new_position:
+        return bool(old_position) != bool(new_position)
+    return (
+        old_position["direction"] != new_position["direction"]
+        or abs(new_position["volume"] - old_position["volume"]) > _VOLUME_EPS
+        or abs(new_position["price"] - old_position["price"]) > _PRICE_EPS
+    )
+
+def _format_position_change(old_position, new_position):
+    """生成持仓变化描述，old_position/new_position为None表示无持仓"""
+    if old_position:
+        old_dir = old_position.get("direction", "无")
+        old_vol = old_position.get("volume", 0)
+        old_price = old_position.get("price", 0)
+        
+        if not new_position:
+            # 持仓被平仓
+            return f"持仓已平仓: 原方向={old_dir}, 原数量={old_vol:.6f}, 原价格={old_price:.4f}"
+        
+        new_dir = new_position.get("direction", "无")
+        new_vol = new_position.get("volume", 0)
+        new_price = new_position.get("price", 0)
+        
+        change_msg = ""
+        if old_dir != new_dir:
+            change_msg = f"方向变化: {old_dir} → {new_dir}, "
+        
+        vol_change = new_vol - old_vol
+        if abs(vol_change) > _VOLUME_EPS:
+            change_msg += f"数量变化: {old_vol:.6f} → {new_vol:.6f} ({'+' if vol_change > 0 else ''}{vol_change:.6f}), "
+        
+        price_change = new_price - old_price
+        if abs(price_change) > _PRICE_EPS:
+            change_msg += f"价格变化: {old_price:.4f} → {new_price:.4f} ({'+' if price_change > 0 else ''}{price_change:.4f})"
+        return change_msg
+    
+    if new_position:
+        # 新建持仓
+        return f"新建持仓: 方向={new_position.get('direction')}, 数量={new_position.get('volume'):.6f}, 价格={new_position.get('price'):.4f}"
+    return ""
 
 class CustomPositionTracker:
     """自定义持仓跟踪器，不依赖VNPy内部机制，同时管理资金"""
     
+    __slots__ = (
+        "_symbols", "_vol", "_price", "_dir", "_positions_view", "_summary_cache",
+        "save_path", "balance", "frozen",
+        "save_interval", "_lock", "_positions_lock", "_dirty",
+        "log_flush_interval", "_last_flush_ts", "_pending_changes", "_log_batch",
+    )
+    
     def __init__(self, save_path="custom_positions.json", initial_balance=10000.0):
-        self.positions = {}  # symbol -> {volume, direction, price}
+        # 持仓按列存储：symbol -> 下标，各列数组按下标保存数量、均价和方向编码
+        self._symbols = {}
+        self._vol = np.zeros(MAX_SYMBOLS, dtype=np.float64)
+        self._price = np.zeros(MAX_SYMBOLS, dtype=np.float64)
+        self._dir = np.zeros(MAX_SYMBOLS, dtype=np.int8)
+        self._positions_view = None  # get_all_positions返回的字典视图，持仓变化时置空重建
+        self._summary_cache = None  # 持仓汇总字符串，持仓变化时置空重建
+        
+        # 预先调用一次，在启动阶段完成numba编译，避免首笔成交时等待编译
+        _apply_trade(0.0, 0.0, _DIR_NONE, 1.0, 1.0, 1)
         self.save_path = Path(save_path).absolute()
         self.balance = initial_balance  # 设置初始资金为10000
         self.frozen = 0.0  # 冻结资金
@@ -656,45 +1019,119 @@ class CustomPositionTracker:
         print(f"初始资金: {self.balance}")
         self.load_positions()
         
+        # 后台写盘：修改时只标记脏数据，由写盘线程合并后统一保存
+        self.save_interval = 0.2  # 秒，约5Hz合并写盘
+        self._lock = threading.Lock()  # 串行化写盘
+        self._positions_lock = threading.Lock()  # 串行化持仓数组的修改
+        self._dirty = threading.Event()
+        
+        # GUI日志按周期合并发送：symbol -> 周期开始前的持仓，以及其他待发送的日志行
+        self.log_flush_interval = 1.0  # 秒
+        self._last_flush_ts = time.monotonic()
+        self._pending_changes = {}
+        self._log_batch = []
+        threading.Thread(target=self._writer_loop, name="PositionWriter", daemon=True).start()
+        # 写盘线程是守护线程，退出时同步写出尚未保存的修改
+        atexit.register(self.flush)
+        
     def load_positions(self):
         """从文件加载持仓数据和资金数据"""
         if self.save_path.exists():
             try:
-                with open(self.save_path, "r") as f:
+                with open(self.save_path, "r", encoding="utf-8") as f:
                     loaded_data = json.load(f)
                     # 检查是否有新格式数据
                     if "positions" in loaded_data and "balance" in loaded_data:
-                        self.positions = loaded_data["positions"]
+                        positions = loaded_data["positions"]
                         self.balance = loaded_data["balance"]
                         self.frozen = loaded_data.get("frozen", 0.0)
                     else:
                         # 兼容旧格式
-                        self.positions = loaded_data
+                        positions = loaded_data
                 print(f"从 {self.save_path} 加载了持仓数据:")
-                for symbol, pos in self.positions.items():
+                for symbol, pos in positions.items():
                     print(f"  - {symbol}: 方向={pos.get('direction', 'None')}, 数量={pos.get('volume', 0)}, 价格={pos.get('price', 0)}")
+                self._set_positions(positions)
                 print(f"当前资金: 余额={self.balance}, 冻结={self.frozen}, 可用={self.balance - self.frozen}")
             except Exception as e:
                 print(f"加载持仓数据出错: {e}")
-                self.positions = {}
+                self._set_positions({})
         else:
             print(f"持仓数据文件 {self.save_path} 不存在，将创建新文件")
-            self.positions = {}
+    
+    def _set_positions(self, positions):
+        """用 symbol -> {volume, direction, price} 字典重置持仓数组"""
+        self._symbols.clear()
+        self._vol[:] = 0.0
+        self._price[:] = 0.0
+        self._dir[:] = _DIR_NONE
+        for symbol, pos in positions.items():
+            idx = self._symbol_index(symbol)
+            volume = pos.get("volume", 0.0)
+            self._vol[idx] = volume
+            self._price[idx] = pos.get("price", 0.0)
+            self._dir[idx] = _DIR_CODES.get(pos.get("direction"), _DIR_NONE) if volume else _DIR_NONE
+        self._positions_view = None
+        self._summary_cache = None
+    
+    def _symbol_index(self, symbol):
+        """获取交易对在持仓数组中的下标，新交易对分配新下标，数组满时翻倍扩容"""
+        idx = self._symbols.get(symbol)
+        if idx is None:
+            idx = len(self._symbols)
+            if idx == self._vol.shape[0]:
+                capacity = idx * 2
+                for name in ("_vol", "_price", "_dir"):
+                    old = getattr(self, name)
+                    new = np.zeros(capacity, dtype=old.dtype)
+                    new[:idx] = old
+                    setattr(self, name, new)
+            self._symbols[symbol] = idx
+        return idx
+    
+    def _position_at(self, idx):
+        """将下标处的持仓转为字典，无持仓时返回None"""
+        direction = self._dir[idx]
+        if direction == _DIR_NONE:
+            return None
+        return {
+            "volume": float(self._vol[idx]),
+            "direction": _DIR_NAMES[direction],
+            "price": float(self._price[idx])
+        }
+    
+    def _writer_loop(self):
+        """写盘线程：等待脏标记，稍作延迟以合并连续的修改后再保存；同时按周期发送持仓日志"""
+        while True:
+            if self._dirty.wait(self.log_flush_interval):
+                time.sleep(self.save_interval)
+                self.save_positions()
+            if time.monotonic() - self._last_flush_ts >= self.log_flush_interval:
+                self._flush_logs()
+    
+    def flush(self):
+        """有未保存的修改时立即同步写盘"""
+        if self._dirty.is_set():
+            self.save_positions()
     
     def save_positions(self):
-        """保存持仓数据和资金数据到文件"""
+        """保存持仓数据和资金数据到文件（先写临时文件再原子替换，避免写到一半的文件）"""
         try:
-            # 新格式保存，包含资金信息
-            save_data = {
-                "positions": self.positions,
-                "balance": self.balance,
-                "frozen": self.frozen,
-                "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            
-            with open(self.save_path, "w") as f:
-                json.dump(save_data, f, indent=4)
-            print(f"持仓和资金数据已保存到 {self.save_path}")
+            with self._lock:
+                self._dirty.clear()
+                
+                # 新格式保存，包含资金信息
+                save_data = {
+                    "positions": self.get_all_positions(),
+                    "balance": self.balance,
+                    "frozen": self.frozen,
+                    "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                
+                tmp_path = self.save_path.with_name(self.save_path.name + ".tmp")
+                _write_file(tmp_path, _dumps(save_data))
+                os.replace(tmp_path, self.save_path)
+            _log_q.append(f"持仓和资金数据已保存到 {self.save_path}")
         except Exception as e:
             print(f"保存持仓数据出错: {e}")
     
@@ -709,34 +1146,28 @@ class CustomPositionTracker:
             return False
         
         self.frozen += amount
-        self.save_positions()
+        self._dirty.set()
         return True
     
     def unfreeze_funds(self, amount):
         """解冻资金，用于撤单或部分成交"""
         self.frozen = max(0, self.frozen - amount)
-        self.save_positions()
+        self._dirty.set()
         return True
     
     def update_balance(self, change_amount, reason="交易"):
         """更新资金余额"""
         old_balance = self.balance
         self.balance += change_amount
-        self.save_positions()
+        self._dirty.set()
         
         balance_msg = f"资金更新 - {reason}: {old_balance:.6f} -> {self.balance:.6f} (变化: {change_amount:+.6f})"
-        print(balance_msg)
+        _log_q.append(balance_msg)
         logging.info(balance_msg)
         
-        # 向GUI发送资金变化日志
-        global main_engine
-        if main_engine:
-            log_data = LogData(
-                msg=f"💰 资金更新 - {reason}: 余额={self.balance:.6f}, 冻结={self.frozen:.6f}, 可用={self.get_available_balance():.6f} (变化: {change_amount:+.6f})",
-                level=logging.INFO,
-                gateway_name="ACCOUNT"
-            )
-            main_engine.event_engine.put(Event(EVENT_LOG, log_data))
+        # 向GUI发送资金变化日志，与持仓日志合并发送
+        if _LOG_INFO_ENABLED:
+            self.queue_log(f"💰 资金更新 - {reason}: 余额={self.balance:.6f}, 冻结={self.frozen:.6f}, 可用={self.get_available_balance():.6f} (变化: {change_amount:+.6f})", "ACCOUNT")
         
         return True
     
@@ -747,150 +1178,209 @@ class CustomPositionTracker:
         price = trade.price
         volume = trade.volume
         
-        # 记录交易到日志文件
-        trade_log = f"交易执行: {symbol}, 方向={direction}, 价格={price:.4f}, 数量={volume:.6f}, 成交金额={price*volume:.6f}"
-        logging.info(trade_log)
-        
-        # 更新前持仓状态
-        old_position = self.positions.get(symbol, {}).copy() if symbol in self.positions else None
+        # 记录交易到日志文件，由logging在确实输出时才格式化
+        logging.info("交易执行: %s, 方向=%s, 价格=%.4f, 数量=%.6f, 成交金额=%.6f", symbol, direction, price, volume, price * volume)
         
-        # 更新持仓
-        if symbol not in self.positions:
-            self.positions[symbol] = {
-                "volume": 0.0,
-                "direction": None,
-                "price": 0.0
-            }
-        
-        pos = self.positions[symbol]
         trade_value = price * volume  # 成交金额
+        sgn = 1 if trade.direction is _LONG else -1  # 买入为+1，卖出为-1
         
-        if direction == "多":
+        if sgn > 0:
             # 买入，资金减少
             self.unfreeze_funds(trade_value)  # 解冻相应资金
             self.update_balance(-trade_value, f"买入 {symbol}")  # 资金减少
-            
-            # 持仓更新
-            if pos["direction"] is None or pos["direction"] == "多":
-                # 新开仓或加仓
-                new_volume = pos["volume"] + volume
-                new_price = (pos["price"] * pos["volume"] + price * volume) / new_volume if new_volume > 0 else price
-                pos["volume"] = new_volume
-                pos["price"] = new_price
-                pos["direction"] = "多"
-            else:
-                # 空头减仓
-                pos["volume"] -= volume
-                if pos["volume"] <= 0:
-                    # 如果平仓后变为多头
-                    pos["volume"] = abs(pos["volume"])
-                    pos["direction"] = "多" if pos["volume"] > 0 else None
-                    pos["price"] = price
         else:
             # 卖出，资金增加
             self.update_balance(trade_value, f"卖出 {symbol}")  # 资金增加
+        
+        with self._positions_lock:
+            idx = self._symbol_index(symbol)
+            
+            # 向GUI发送的持仓变化日志只登记，由写盘线程每秒合并发送一次；日志级别过滤掉INFO时不登记
+            # 同一交易对在一个周期内多次变化时只保留最早的原持仓，发送时与最新持仓对比
+            if main_engine and _LOG_INFO_ENABLED and symbol not in self._pending_changes:
+                self._pending_changes[symbol] = self._position_at(idx)
             
             # 持仓更新
-            if pos["direction"] is None or pos["direction"] == "空":
-                # 新开空仓或加空仓
-                new_volume = pos["volume"] + volume
-                new_price = (pos["price"] * pos["volume"] + price * volume) / new_volume if new_volume > 0 else price
-                pos["volume"] = new_volume
-                pos["price"] = price
-                pos["direction"] = "空"
-            else:
-                # 多头减仓
-                pos["volume"] -= volume
-                if pos["volume"] <= 0:
-                    # 如果平仓后变为空头
-                    pos["volume"] = abs(pos["volume"])
-                    pos["direction"] = "空" if pos["volume"] > 0 else None
-                    pos["price"] = price
-        
-        # 如果持仓量为0，删除该持仓
-        if pos["volume"] == 0:
-            del self.positions[symbol]
-        
-        # 保存更新后的持仓
-        self.save_positions()
-        print(f"持仓已更新 - {symbol}: 方向={pos.get('direction')}, 数量={pos.get('volume')}, 价格={pos.get('price')}")
-        
-        # 向GUI发送持仓变化日志
-        global main_engine
+            self._vol[idx], self._price[idx], self._dir[idx] = _apply_trade(
+                float(self._vol[idx]), float(self._price[idx]), int(self._dir[idx]),
+                float(volume), float(price), sgn
+            )
+            self._positions_view = None
+            self._summary_cache = None
+            new_position = self._position_at(idx)
+        
+        # 标记待保存，由写盘线程合并写入
+        self._dirty.set()
+        if new_position:
+            _log_q.append(f"持仓已更新 - {symbol}: 方向={new_position['direction']}, 数量={new_position['volume']}, 价格={new_position['price']}")
+        else:
+            _log_q.append(f"持仓已更新 - {symbol}: 已平仓")
+    
+    def queue_log(self, msg, gateway_name):
+        """登记一条发往GUI的INFO日志，由写盘线程按周期批量发送；调用方先检查_LOG_INFO_ENABLED再格式化消息"""
         if main_engine:
-            # 计算持仓变化
-            change_msg = ""
-            if old_position:
-                old_dir = old_position.get("direction", "无")
-                old_vol = old_position.get("volume", 0)
-                old_price = old_position.get("price", 0)
-                
-                if symbol in self.positions:
-                    new_dir = pos.get("direction", "无")
-                    new_vol = pos.get("volume", 0)
-                    new_price = pos.get("price", 0)
-                    
-                    if old_dir != new_dir:
-                        change_msg = f"方向变化: {old_dir} → {new_dir}, "
-                    
-                    vol_change = new_vol - old_vol
-                    if vol_change != 0:
-                        change_msg += f"数量变化: {old_vol:.6f} → {new_vol:.6f} ({'+' if vol_change > 0 else ''}{vol_change:.6f}), "
-                    
-                    price_change = new_price - old_price
-                    if price_change != 0:
-                        change_msg += f"价格变化: {old_price:.4f} → {new_price:.4f} ({'+' if price_change > 0 else ''}{price_change:.4f})"
-                else:
-                    # 持仓被平仓
-                    change_msg = f"持仓已平仓: 原方向={old_dir}, 原数量={old_vol:.6f}, 原价格={old_price:.4f}"
-            else:
-                # 新建持仓
-                if symbol in self.positions:
-                    change_msg = f"新建持仓: 方向={pos.get('direction')}, 数量={pos.get('volume'):.6f}, 价格={pos.get('price'):.4f}"
-            
-            # 发送持仓变化日志
+            with self._positions_lock:
+                self._log_batch.append((gateway_name, msg))
+    
+    def _flush_logs(self):
+        """将周期内累积的资金、成交和持仓变化日志批量发送到GUI，每行一条日志事件并保留来源，持仓有变化时附带持仓汇总"""
+        self._last_flush_ts = time.monotonic()
+        with self._positions_lock:
+            if not self._pending_changes and not self._log_batch:
+                return
+            lines, self._log_batch = self._log_batch, []
+            pending, self._pending_changes = self._pending_changes, {}
+            changes = []
+            for symbol, old_position in pending.items():
+                new_position = self._position_at(self._symbols[symbol])
+                # 周期内来回变化后与原持仓一致的交易对不再输出
+                if _position_changed(old_position, new_position):
+                    changes.append((symbol, old_position, new_position))
+        
+        if not changes and not lines:
+            return
+        
+        global main_engine
+        if not main_engine:
+            return
+        
+        for symbol, old_position, new_position in changes:
+            change_msg = _format_position_change(old_position, new_position)
             if change_msg:
-                log_data = LogData(
-                    msg=f"📊 持仓更新 - {symbol}: {change_msg}",
-                    level=logging.INFO,
-                    gateway_name="POSITION"
-                )
-                main_engine.event_engine.put(Event(EVENT_LOG, log_data))
-            
-            # 发送当前所有持仓的汇总信息
-            position_summary = "无持仓"
-            if self.positions:
-                position_list = []
-                for sym, p in self.positions.items():
-                    position_list.append(f"{sym}: {p.get('direction', '无')}/{p.get('volume', 0):.6f}/{p.get('price', 0):.2f}")
-                position_summary = ", ".join(position_list)
-                
-            log_data = LogData(
-                msg=f"📈 持仓汇总: {position_summary}",
-                level=logging.INFO,
-                gateway_name="SUMMARY"
-            )
-            main_engine.event_engine.put(Event(EVENT_LOG, log_data))
+                lines.append(("POSITION", f"📊 持仓更新 - {symbol}: {change_msg}"))
+        
+        # 附带当前所有持仓的汇总信息
+        if changes:
+            lines.append(("SUMMARY", f"📈 持仓汇总: {self.summary}"))
+        
+        # 每行单独一条日志，保持日志文件逐行可检索
+        put = main_engine.event_engine.put
+        for gateway_name, msg in lines:
+            put(Event(EVENT_LOG, LogData(msg=msg, level=logging.INFO, gateway_name=gateway_name)))
+    
+    @property
+    def summary(self):
+        """所有持仓的汇总字符串，持仓不变时复用上次的结果"""
+        summary = self._summary_cache
+        if summary is None:
+            with self._positions_lock:
+                holdings = [
+                    f"{sym}: {_DIR_NAMES[self._dir[i]]}/{self._vol[i]:.6f}/{self._price[i]:.2f}"
+                    for sym, i in self._symbols.items() if self._dir[i] != _DIR_NONE
+                ]
+                summary = ", ".join(holdings) if holdings else "无持仓"
+                self._summary_cache = summary
+        return summary
     
     def get_all_positions(self):
-        """获取所有持仓"""
-        return self.positions
+        """获取所有持仓 symbol -> {volume, direction, price}（持仓不变时返回同一字典，调用方不应修改）"""
+        positions = self._positions_view
+        if positions is None:
+            with self._positions_lock:
+                positions = {}
+                for symbol, idx in self._symbols.items():
+                    pos = self._position_at(idx)
+                    if pos:
+                        positions[symbol] = pos
+                self._positions_view = positions
+        return positions
+        
+    def get_position_value(self):
+        """按持仓价格计算所有持仓的总价值"""
+        n = len(self._symbols)
+        return float(np.dot(self._vol[:n], self._price[:n]))
         
     def has_position_to_sell(self, symbol, volume):
         """检查是否有足够的多头持仓可卖"""
-        if symbol not in self.positions:
-            return False
-            
-        pos = self.positions[symbol]
-        return pos.get("direction") == "多" and pos.get("volume", 0) >= volume
+        idx = self._symbols.get(symbol)
+        return idx is not None and bool(self._dir[idx] == _DIR_LONG and self._vol[idx] >= volume)
         
     def has_enough_balance(self, amount):
         """检查是否有足够的资金可用"""
         return self.get_available_balance() >= amount
 
+class MpscRingQueue:
+    """多生产者单消费者事件队列，入队无锁，消费端批量取出"""
+    __slots__ = ("_buf", "_wakeup")
+
+    def __init__(self):
+        # deque.append/popleft在GIL下是原子操作，生产者之间无需加锁
+        self._buf = collections.deque()
+        self._wakeup = threading.Event()
+
+    def put(self, item):
+        """入队并在消费者等待时唤醒"""
+        self._buf.append(item)
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def get_batch(self, max_items=64, timeout=1.0):
+        """一次取出至多max_items个元素，队列为空时最多等待timeout秒"""
+        buf = self._buf
+        if not buf:
+            self._wakeup.clear()
+            # 清除标志后再检查一次，避免丢失clear之前的入队唤醒
+            if not buf and not self._wakeup.wait(timeout):
+                return []
+        popleft = buf.popleft
+        batch = []
+        try:
+            for _ in range(max_items):
+                batch.append(popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def __len__(self):
+        return len(self._buf)
+
+
+class BatchEventEngine(EventEngine):
+    """使用MpscRingQueue的事件引擎，分发线程每次批量处理事件"""
+
+    def __init__(self, interval: int = 1, batch_size: int = 64):
+        super().__init__(interval)
+        self._queue = MpscRingQueue()
+        self._batch_size = batch_size
+
+    def _run(self) -> None:
+        """批量取出事件并依次分发"""
+        queue_ = self._queue
+        process = self._process
+        batch_size = self._batch_size
+        while self._active:
+            for event in queue_.get_batch(max_items=batch_size):
+                process(event)
+
+    def put(self, event: Event) -> None:
+        """无锁入队"""
+        self._queue.put(event)
+
+
+# 生成模拟历史数据用的随机数生成器
+_rng = np.random.default_rng()
+
+@dataclass(slots=True)
+class _AccountSnapshot:
+    """自维护账户数据的快照，兼容CtaTemplate读取的账户字段"""
+    balance: float
+    frozen: float
+    available: float
+    accountid: str = "CUSTOM"
+
 # 添加一个简单的引擎适配器类
 class EngineAdapter:
     """引擎适配器，用于连接MainEngine和Strategy"""
+    
+    # strategy 为可选绑定的策略实例，供update_bar使用，未绑定时不赋值
+    __slots__ = (
+        "main_engine", "event_engine", "gateway_name", "capital",
+        "strategy_orderid_map", "strategy_order_map",
+        "_next_oid", "_free_oids", "_oid_map", "_oids", "_active_bits",
+        "strategies", "subscribed_symbols", "_symbol_to_strategies",
+        "position_tracker", "_contract_cache", "strategy",
+    )
+    
     def __init__(self, main_engine):
         self.main_engine = main_engine
         self.event_engine = main_engine.event_engine
@@ -898,20 +1388,37 @@ class EngineAdapter:
         self.capital = 100000  # 设置初始资金
         self.strategy_orderid_map = {}  # vt_orderid -> strategy
         self.strategy_order_map = {}  # strategy -> set of vt_orderids
-        self.active_orderids = set()  # active vt_orderids
+        
+        # 活跃委托位图：发单时为每个vt_orderid分配一个整数编号，活跃委托对应位为True
+        # 委托结束后回收编号，位图和映射的大小只取决于同时活跃的委托数
+        self._next_oid = 0
+        self._free_oids = []  # 已回收、可复用的整数编号
+        self._oid_map = {}  # vt_orderid -> 整数编号
+        self._oids = []  # 整数编号 -> vt_orderid
+        self._active_bits = np.zeros(1 << 16, dtype=np.bool_)
         
         # 添加策略映射和订阅信息
         self.strategies = {}  # strategy_name -> strategy
         self.subscribed_symbols = {}  # strategy_name -> set of vt_symbols
+        self._symbol_to_strategies = {}  # 小写vt_symbol -> 订阅该合约的策略列表，行情分发时O(1)查找
         
         # 使用全局持仓跟踪器
         global global_position_tracker
         self.position_tracker = global_position_tracker
         
+        # 合约信息缓存 vt_symbol -> ContractData，合约推送时更新
+        self._contract_cache = {}
+        self.event_engine.register(EVENT_CONTRACT, self.process_contract_event)
+    
+    def process_contract_event(self, event: Event) -> None:
+        """合约推送，更新合约缓存"""
+        contract = event.data
+        self._contract_cache[contract.vt_symbol] = contract
+        
     def write_log(self, msg, strategy=None):
         """记录日志，兼容CtaTemplate的接口"""
         strategy_name = strategy.strategy_name if strategy else "未知策略"
-        print(f"[{strategy_name}] {msg}")
+        _log_q.append(f"[{strategy_name}] {msg}")
         
         # 如果有主引擎，也发送日志事件
         if self.main_engine:
@@ -925,12 +1432,12 @@ class EngineAdapter:
         
     def send_order(self, strategy, direction, offset, price, volume, stop=False, lock=False, net=False):
         """发送委托"""
-        print(f"发送委托：{strategy.vt_symbol} {direction} {offset} {price} {volume}")
+        _dbg("发送委托：%s %s %s %s %s", strategy.vt_symbol, direction, offset, price, volume)
         
         vt_symbol = strategy.vt_symbol
-        contract = self.main_engine.get_contract(vt_symbol)
+        contract = self.get_contract(vt_symbol)
         if not contract:
-            print(f"找不到合约：{vt_symbol}")
+            _log_q.append(f"找不到合约：{vt_symbol}")
             return ""
         
         req = OrderRequest(
@@ -955,22 +1462,37 @@ class EngineAdapter:
                 self.strategy_order_map[strategy] = set()
             self.strategy_order_map[strategy].add(vt_orderid)
             
-            # 添加到所有委托集合中
-            self.active_orderids.add(vt_orderid)
+            # 分配整数编号并标记为活跃：优先复用回收的编号，位图用满时翻倍扩容
+            if self._free_oids:
+                oid = self._free_oids.pop()
+                self._oids[oid] = vt_orderid
+            else:
+                oid = self._next_oid
+                self._next_oid += 1
+                if oid == self._active_bits.shape[0]:
+                    self._active_bits = np.concatenate((self._active_bits, np.zeros(oid, dtype=np.bool_)))
+                self._oids.append(vt_orderid)
+            self._oid_map[vt_orderid] = oid
+            self._active_bits[oid] = True
             
-            print(f"委托发送成功，vt_orderid：{vt_orderid}")
+            _log_q.append(f"委托发送成功，vt_orderid：{vt_orderid}")
         else:
-            print(f"委托发送失败")
+            _log_q.append(f"委托发送失败")
         
         return vt_orderid
 
+    def get_active_orderids(self):
+        """获取所有活跃委托的vt_orderid列表"""
+        oids = self._oids
+        return [oids[oid] for oid in np.flatnonzero(self._active_bits[:self._next_oid])]
+
     def cancel_order(self, strategy, vt_orderid):
         """撤销委托"""
-        print(f"撤销委托：{vt_orderid}")
+        _log_q.append(f"撤销委托：{vt_orderid}")
         
         order = self.main_engine.get_order(vt_orderid)
         if not order:
-            print(f"找不到委托：{vt_orderid}")
+            _log_q.append(f"找不到委托：{vt_orderid}")
             return
         
         req = CancelRequest(
@@ -984,7 +1506,7 @@ class EngineAdapter:
 
     def get_pricetick(self, strategy):
         """获取价格跳动"""
-        contract = self.main_engine.get_contract(strategy.vt_symbol)
+        contract = self.get_contract(strategy.vt_symbol)
         if contract:
             return contract.pricetick
         else:
@@ -996,22 +1518,24 @@ class EngineAdapter:
         # 实际邮件发送逻辑可根据需要添加
 
     def get_contract(self, vt_symbol):
-        """获取合约信息"""
-        return self.main_engine.get_contract(vt_symbol)
+        """获取合约信息，优先从缓存读取"""
+        contract = self._contract_cache.get(vt_symbol)
+        if contract is None:
+            contract = self.main_engine.get_contract(vt_symbol)
+            if contract:
+                self._contract_cache[vt_symbol] = contract
+        return contract
     
     def get_account(self):
         """获取账户信息 - 使用自维护的账户数据"""
         global global_position_tracker
         if global_position_tracker:
-            # 创建一个简单的账户对象，只包含基本信息
-            class SimpleAccount:
-                def __init__(self):
-                    self.balance = global_position_tracker.balance
-                    self.frozen = global_position_tracker.frozen
-                    self.available = global_position_tracker.get_available_balance()
-                    self.accountid = "CUSTOM"
-                    
-            return SimpleAccount()
+            # 返回一个简单的账户对象，只包含基本信息
+            return _AccountSnapshot(
+                global_position_tracker.balance,
+                global_position_tracker.frozen,
+                global_position_tracker.get_available_balance()
+            )
         return None
     
     def get_tick(self, vt_symbol):
@@ -1021,26 +1545,29 @@ class EngineAdapter:
     def subscribe(self, vt_symbol):
         """订阅行情，兼容多种调用方式"""
         # 如果传入的是策略实例，则获取其vt_symbol
+        strategy = None
         if hasattr(vt_symbol, 'vt_symbol'):
-            vt_symbol = vt_symbol.vt_symbol
+            strategy = vt_symbol
+            vt_symbol = strategy.vt_symbol
             
         if not vt_symbol:
             print("错误: 没有指定要订阅的交易对")
             return
+        
+        # 维护合约到策略的反向索引，供on_tick直接分发
+        if strategy is not None:
+            targets = self._symbol_to_strategies.setdefault(vt_symbol.lower(), [])
+            if strategy not in targets:
+                targets.append(strategy)
             
         print(f"订阅 {vt_symbol} 的行情")
         
-        # 解析交易对和交易所
-        if "." in vt_symbol:
-            symbol, exchange_str = vt_symbol.split(".")
-            exchange = Exchange(exchange_str)
-        else:
-            symbol = vt_symbol
-            exchange = Exchange.BINANCE
+        # 解析交易对和交易所，交易对已转为小写
+        symbol, exchange = _parse_vt_symbol(vt_symbol)
             
         # 创建订阅请求
         req = SubscribeRequest(
-            symbol=symbol.lower(),  # 确保小写
+            symbol=symbol,
             exchange=exchange
         )
         
@@ -1076,81 +1603,81 @@ class EngineAdapter:
         end_time = current_time
         start_time = current_time - timedelta(days=days)
         
-        bars = []
         # 根据不同的时间周期生成不同数量的K线
         if interval == Interval.DAILY:
             # 生成每日K线
             step = timedelta(days=1)
-            bar_time = start_time
-            while bar_time <= end_time:
-                # 为每个K线生成随机数据
-                bar = self._create_bar("btcusdt.BINANCE", bar_time, interval)
-                bars.append(bar)
-                
-                # 如果有回调函数，则执行回调
-                if callback:
-                    callback(bar)
-                    
-                bar_time += step
-        
+            bar_times = [start_time + step * i for i in range((end_time - start_time) // step + 1)]
         # 可以添加其他时间周期的处理逻辑
         elif interval == Interval.MINUTE:
             # 生成分钟K线，这里简化为只生成最近的30条
-            for i in range(30):
-                bar_time = end_time - timedelta(minutes=30-i)
-                bar = self._create_bar("btcusdt.BINANCE", bar_time, interval)
-                bars.append(bar)
-                
-                if callback:
-                    callback(bar)
+            bar_times = [end_time - timedelta(minutes=30-i) for i in range(30)]
+        else:
+            bar_times = []
+        
+        bars = self._create_bars("btcusdt.BINANCE", bar_times, interval)
+        
+        # 如果有回调函数，则执行回调
+        if callback:
+            for bar in bars:
+                callback(bar)
         
         print(f"已加载 {len(bars)} 条 {interval.value} K线数据")
         return bars
     
-    def _create_bar(self, vt_symbol, bar_time, interval):
-        """生成一个随机的K线数据"""
+    def _create_bars(self, vt_symbol, bar_times, interval):
+        """按时间列表批量生成随机K线数据，各价格列一次性用numpy生成"""
         # 解析交易对和交易所
-        if "." in vt_symbol:
-            symbol, exchange_str = vt_symbol.split(".")
-            exchange = Exchange(exchange_str)
-        else:
-            symbol = vt_symbol
-            exchange = Exchange.BINANCE
+        symbol, exchange = _parse_vt_symbol(vt_symbol)
+        
+        n = len(bar_times)
+        if not n:
+            return []
         
         # 根据间隔调整随机范围
+        base_price = 100.0
         if interval == Interval.DAILY:
             # 日线波动略大
-            base_price = 100.0
-            open_price = base_price + random.uniform(-5, 5)
-            high_price = open_price + random.uniform(0, 5)
-            low_price = open_price - random.uniform(0, 5)
-            close_price = (open_price + high_price + low_price) / 3 + random.uniform(-2, 2)
-            volume = 1000.0 + random.uniform(-200, 200)
-            turnover = close_price * volume
+            price_range, close_range, base_volume, volume_range = 5.0, 2.0, 1000.0, 200.0
         else:
             # 分钟线波动小
-            base_price = 100.0
-            open_price = base_price + random.uniform(-2, 2)
-            high_price = open_price + random.uniform(0, 2)
-            low_price = open_price - random.uniform(0, 2)
-            close_price = (open_price + high_price + low_price) / 3 + random.uniform(-1, 1)
-            volume = 100.0 + random.uniform(-20, 20)
-            turnover = close_price * volume
-            
-        # 创建并返回K线对象
-        return BarData(
-            symbol=symbol,
-            exchange=exchange,
-            datetime=bar_time,
-            interval=interval,
-            open_price=open_price,
-            high_price=max(high_price, open_price, close_price),
-            low_price=min(low_price, open_price, close_price),
-            close_price=close_price,
-            volume=volume,
-            turnover=turnover,
-            gateway_name=self.gateway_name
+            price_range, close_range, base_volume, volume_range = 2.0, 1.0, 100.0, 20.0
+        
+        # 一次生成所有随机数，列依次为：开盘偏移、上影、下影、收盘偏移、成交量偏移
+        noise = _rng.uniform(
+            [-price_range, 0.0, 0.0, -close_range, -volume_range],
+            [price_range, price_range, price_range, close_range, volume_range],
+            size=(n, 5)
         )
+        open_prices = base_price + noise[:, 0]
+        high_prices = open_prices + noise[:, 1]
+        low_prices = open_prices - noise[:, 2]
+        close_prices = (open_prices + high_prices + low_prices) / 3 + noise[:, 3]
+        volumes = base_volume + noise[:, 4]
+        turnovers = close_prices * volumes
+        high_prices = np.maximum(high_prices, np.maximum(open_prices, close_prices))
+        low_prices = np.minimum(low_prices, np.minimum(open_prices, close_prices))
+        
+        # 创建并返回K线对象
+        return [
+            BarData(
+                symbol=symbol,
+                exchange=exchange,
+                datetime=bar_time,
+                interval=interval,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                volume=volume,
+                turnover=turnover,
+                gateway_name=self.gateway_name
+            )
+            for bar_time, open_price, high_price, low_price, close_price, volume, turnover in zip(
+                bar_times, open_prices.tolist(), high_prices.tolist(), low_prices.tolist(),
+                close_prices.tolist(), volumes.tolist(), turnovers.tolist()
+            )
+        ]
 
     def load_tick(self, days, callback=None):
         """加载历史Tick数据，生成模拟数据"""
@@ -1166,17 +1693,34 @@ class EngineAdapter:
         symbol = "btcusdt"
         exchange = Exchange.BINANCE
             
-        ticks = []
         # 简化为生成最近的100个tick
-        for i in range(100):
+        n = 100
+        base_price = 100.0
+        
+        # 一次生成所有随机数，列依次为：最新价偏移、买价差、卖价差、最高价偏移、最低价偏移、成交量偏移、买量偏移、卖量偏移
+        noise = _rng.uniform(
+            [-1.0, 0.1, 0.1, 0.0, 0.0, -2.0, -1.0, -1.0],
+            [1.0, 0.5, 0.5, 1.0, 1.0, 2.0, 1.0, 1.0],
+            size=(n, 8)
+        )
+        last_prices = base_price + noise[:, 0]
+        columns = (
+            last_prices,
+            last_prices - noise[:, 1],  # 买一价
+            last_prices + noise[:, 2],  # 卖一价
+            last_prices + noise[:, 3],  # 最高价
+            last_prices - noise[:, 4],  # 最低价
+            10.0 + noise[:, 5],  # 成交量
+            5.0 + noise[:, 6],  # 买一量
+            5.0 + noise[:, 7],  # 卖一量
+        )
+        
+        ticks = []
+        for i, (last_price, bid_price, ask_price, high_price, low_price, volume, bid_volume, ask_volume) in enumerate(
+            zip(*(column.tolist() for column in columns))
+        ):
             tick_time = end_time - timedelta(seconds=100-i)
             
-            # 生成随机价格
-            base_price = 100.0
-            last_price = base_price + random.uniform(-1, 1)
-            bid_price = last_price - random.uniform(0.1, 0.5)
-            ask_price = last_price + random.uniform(0.1, 0.5)
-            
             # 显式添加类型注释
             tick: TickData = TickData(
                 symbol=symbol,
@@ -1184,21 +1728,22 @@ class EngineAdapter:
                 datetime=tick_time,
                 name=f"{symbol}",
                 last_price=last_price,
-                high_price=last_price + random.uniform(0, 1),
-                low_price=last_price - random.uniform(0, 1),
-                volume=10.0 + random.uniform(-2, 2),
+                high_price=high_price,
+                low_price=low_price,
+                volume=volume,
                 turnover=last_price * 10.0,
                 open_interest=0,
                 bid_price_1=bid_price,
-                bid_volume_1=5.0 + random.uniform(-1, 1),
+                bid_volume_1=bid_volume,
                 ask_price_1=ask_price,
-                ask_volume_1=5.0 + random.uniform(-1, 1),
+                ask_volume_1=ask_volume,
                 gateway_name=self.gateway_name
             )
             ticks.append(tick)
-            
-            # 如果有回调函数，则执行回调
-            if callback:
+        
+        # 如果有回调函数，则执行回调
+        if callback:
+            for tick in ticks:
                 callback(tick)
         
         print(f"已加载 {len(ticks)} 条Tick数据")
@@ -1211,71 +1756,75 @@ class EngineAdapter:
 
     def on_order(self, order: OrderData) -> None:
         """订单更新推送"""
-        print(f"收到委托回报：{order}")
+        _dbg("收到委托回报：%s", order)
         
-        # 使用SimpleTCA记录订单
-        global global_tca
-        if global_tca and hasattr(order, 'price') and hasattr(order, 'direction') and hasattr(order, 'volume') and hasattr(order, 'vt_orderid'):
-            global_tca.record_order(order.price, order.direction, order.volume, order.vt_orderid)
-            print(f"TCA: 记录订单 {order.vt_orderid} 到SimpleTCA")
+        # 使用SimpleTCA记录订单，字段缺失时跳过
+        tca = global_tca
+        if tca:
+            try:
+                tca.record_order(order.price, order.direction, order.volume, order.vt_orderid)
+            except AttributeError:
+                pass
+            else:
+                _dbg("TCA: 记录订单 %s 到SimpleTCA", order.vt_orderid)
             
-        # 更新活跃订单状态
-        if order.status in [Status.ALLTRADED, Status.CANCELLED, Status.REJECTED, Status.EXPIRED]:
-            if order.vt_orderid in self.active_orders:
-                self.active_orders.remove(order.vt_orderid)
-        
-        # 查找对应的策略并推送订单更新
-        for strategy_name, strategy_orders in self.strategy_orders.items():
-            if order.vt_orderid in strategy_orders:
-                strategy = self.strategies.get(strategy_name)
-                if strategy:
-                    strategy.on_order(order)
-                break
+        # 通过委托号索引查找对应的策略
+        vt_orderid = order.vt_orderid
+        strategy = self.strategy_orderid_map.get(vt_orderid)
+        
+        # 委托结束后清除活跃位、回收整数编号并移出策略的委托集合；委托号到策略的映射保留，供之后到达的成交回报查找
+        if order.status in _TERMINAL_STATUSES:
+            oid = self._oid_map.pop(vt_orderid, None)
+            if oid is not None:
+                self._active_bits[oid] = False
+                self._oids[oid] = None
+                self._free_oids.append(oid)
+            if strategy is not None:
+                strategy_orderids = self.strategy_order_map.get(strategy)
+                if strategy_orderids:
+                    strategy_orderids.discard(vt_orderid)
+        
+        # 推送订单更新
+        if strategy is not None:
+            strategy.on_order(order)
 
     def on_trade(self, trade: TradeData) -> None:
         """成交推送"""
-        print(f"收到成交回报：{trade}")
+        _dbg("收到成交回报：%s", trade)
         
-        # 使用SimpleTCA记录成交
-        global global_tca
-        if global_tca and hasattr(trade, 'price') and hasattr(trade, 'direction') and hasattr(trade, 'volume') and hasattr(trade, 'vt_orderid'):
-            # 检查是否有对应的订单记录
-            order_found = False
-            for order in global_tca.order_records:
-                if order["order_id"] == trade.vt_orderid:
-                    order_found = True
-                    break
-                    
-            if not order_found:
-                # 如果没有找到订单记录，先添加一个
-                global_tca.record_order(trade.price, trade.direction, trade.volume, trade.vt_orderid)
-                print(f"TCA: 补充订单记录 {trade.vt_orderid}")
-            
-            # 记录成交
-            global_tca.record_trade(trade.price, trade.direction, trade.volume, trade.vt_orderid)
+        # 使用SimpleTCA记录成交，字段缺失时跳过
+        tca = global_tca
+        if tca:
+            try:
+                price, direction, volume, vt_orderid = trade.price, trade.direction, trade.volume, trade.vt_orderid
+            except AttributeError:
+                pass
+            else:
+                # 如果没有找到对应的订单记录，先添加一个
+                if not tca.has_order(vt_orderid):
+                    tca.record_order(price, direction, volume, vt_orderid)
+                    _dbg("TCA: 补充订单记录 %s", vt_orderid)
+                
+                # 记录成交
+                tca.record_trade(price, direction, volume, vt_orderid)
             
         # 更新自定义持仓
         if self.position_tracker:
             self.position_tracker.update_from_trade(trade)
         
         # 查找对应的策略并推送成交更新
-        for strategy_name, strategy_orders in self.strategy_orders.items():
-            if trade.vt_orderid in strategy_orders:
-                strategy = self.strategies.get(strategy_name)
-                if strategy:
-                    strategy.on_trade(trade)
-                break
+        strategy = self.strategy_orderid_map.get(trade.vt_orderid)
+        if strategy is not None:
+            strategy.on_trade(trade)
         
     def on_tick(self, tick: TickData) -> None:
         """行情推送"""
         # SimpleTCA不需要行情数据，不再调用update_tick
         # 行情数据仅用于策略交易决策
         
-        # 遍历所有策略，根据订阅的合约推送行情
-        vt_symbol = tick.vt_symbol
-        for strategy_name, strategy in self.strategies.items():
-            if vt_symbol in self.subscribed_symbols.get(strategy_name, set()):
-                strategy.on_tick(tick)
+        # 通过合约反向索引直接找到订阅该合约的策略
+        for strategy in self._symbol_to_strategies.get(tick.vt_symbol.lower(), ()):
+            strategy.on_tick(tick)
 
 def setup_strategy(main_engine, position_tracker):
     """设置简单策略"""
@@ -1304,52 +1853,49 @@ def on_trade_custom(event):
     global global_position_tracker, global_tca, main_engine
     
     if global_position_tracker is None:
-        print("警告：持仓跟踪器未初始化")
+        _log_q.append("警告：持仓跟踪器未初始化")
         return
         
     trade = event.data
-    print(f"成交事件: {trade.symbol}, {trade.direction}, 数量: {trade.volume}, 价格: {trade.price}")
+    _dbg("成交事件: %s, %s, 数量: %s, 价格: %s", trade.symbol, trade.direction, trade.volume, trade.price)
     
     # 使用SimpleTCA记录成交，如果有对应订单的话
-    if global_tca and hasattr(trade, 'vt_orderid'):
-        # 检查SimpleTCA中是否已有此订单记录，如果没有，先添加
-        order_found = False
-        for order in global_tca.order_records:
-            if order["order_id"] == trade.vt_orderid:
-                order_found = True
-                break
-                
-        if not order_found:
-            # 如果没有找到订单记录，先添加一个
-            global_tca.record_order(trade.price, trade.direction, trade.volume, trade.vt_orderid)
-            print(f"TCA: 补充订单记录 {trade.vt_orderid}")
-        
-        # 记录成交
-        global_tca.record_trade(trade.price, trade.direction, trade.volume, trade.vt_orderid)
+    tca = global_tca
+    if tca:
+        try:
+            vt_orderid = trade.vt_orderid
+        except AttributeError:
+            vt_orderid = None
+        if vt_orderid is not None:
+            # 检查SimpleTCA中是否已有此订单记录，如果没有，先添加
+            if not tca.has_order(vt_orderid):
+                tca.record_order(trade.price, trade.direction, trade.volume, vt_orderid)
+                _dbg("TCA: 补充订单记录 %s", vt_orderid)
+            
+            # 记录成交
+            tca.record_trade(trade.price, trade.direction, trade.volume, vt_orderid)
     
     # 使用自定义持仓跟踪器更新持仓
     global_position_tracker.update_from_trade(trade)
     
-    # 向GUI发送成交信息日志
-    if main_engine:
-        log_data = LogData(
-            msg=f"✅ 成交确认: {trade.symbol}, 方向: {trade.direction.value}, 数量: {trade.volume}, 价格: {trade.price:.4f}, 时间: {trade.datetime}",
-            level=logging.INFO,
-            gateway_name="TRADE"
+    # 向GUI发送成交信息日志，由持仓跟踪器与资金、持仓变化日志合并发送
+    if _LOG_INFO_ENABLED:
+        global_position_tracker.queue_log(
+            f"✅ 成交确认: {trade.symbol}, 方向: {trade.direction.value}, 数量: {trade.volume}, 价格: {trade.price:.4f}, 时间: {trade.datetime}",
+            "TRADE"
         )
-        main_engine.event_engine.put(Event(EVENT_LOG, log_data))
     
     # 显示当前所有持仓
-    print("\n=== 自定义持仓跟踪器 - 当前持仓 ===")
+    _log_q.append("\n=== 自定义持仓跟踪器 - 当前持仓 ===")
     positions = global_position_tracker.get_all_positions()
     if positions:
         for symbol, pos in positions.items():
-            print(f"持仓: {symbol}, 方向: {pos['direction']}, 数量: {pos['volume']}, 价格: {pos['price']}")
+            _log_q.append(f"持仓: {symbol}, 方向: {pos['direction']}, 数量: {pos['volume']}, 价格: {pos['price']}")
     else:
-        print("当前没有持仓")
+        _log_q.append("当前没有持仓")
     
     # 显示当前资金
-    print(f"当前资金: 余额={global_position_tracker.balance:.6f}, 冻结={global_position_tracker.frozen:.6f}, 可用={global_position_tracker.get_available_balance():.6f}")
+    _log_q.append(f"当前资金: 余额={global_position_tracker.balance:.6f}, 冻结={global_position_tracker.frozen:.6f}, 可用={global_position_tracker.get_available_balance():.6f}")
 
 def on_tick(event, strategy_instance):
     """行情更新事件处理函数"""
@@ -1373,24 +1919,9 @@ def on_tick(event, strategy_instance):
         # 直接调用策略的on_tick方法
         strategy_instance.on_tick(tick)
         
-        # 每5个tick就创建一次K线，控制K线生成频率
-        if len(strategy_instance.ticks) % 5 == 0:
-            # 创建一个简单的分钟K线并传给策略
-            bar = BarData(
-                symbol=tick.symbol,
-                exchange=tick.exchange,
-                datetime=tick.datetime,
-                interval=Interval.MINUTE,
-                open_price=tick.last_price,
-                high_price=tick.last_price,
-                low_price=tick.last_price,
-                close_price=tick.last_price,
-                volume=tick.volume,
-                turnover=tick.turnover if hasattr(tick, 'turnover') else tick.last_price * tick.volume,
-                gateway_name=tick.gateway_name
-            )
-            
-            # 调用策略的on_bar方法
+        # Tick增量合成分钟K线，跨分钟时把完成的K线传给策略
+        bar = strategy_instance.update_bar(tick)
+        if bar is not None:
             strategy_instance.on_bar(bar)
         
     except Exception as e:
@@ -1401,23 +1932,17 @@ def on_tick(event, strategy_instance):
 # 策略运行函数，将在单独的线程中执行
 def run_strategy_thread(strategy, global_position_tracker):
     """在单独的线程中运行策略"""
-    global strategy_running
-    
     print("\n策略线程启动，将持续监控市场并执行交易信号...")
     print("关闭主窗口或按 Ctrl+C 可以中断程序")
     
-    # 保持线程运行，并定期检查持仓情况
-    counter = 0
-    while strategy_running:
-        # 短暂暂停，减少CPU使用
-        time.sleep(0.5)
-        
-        counter += 1
-        
-        # 每300次循环(约2.5分钟)显示一次持仓情况
-        if counter % 300 == 0:
+    # 保持线程运行，每2.5分钟检查一次持仓情况，收到停止信号时立即退出
+    last_positions = None
+    while not strategy_stop_event.wait(timeout=150):
+        # 持仓不变时get_all_positions返回同一个字典，此时不重复打印
+        positions = global_position_tracker.get_all_positions()
+        if positions is not last_positions:
+            last_positions = positions
             print("\n=== 当前持仓情况 ===")
-            positions = global_position_tracker.get_all_positions()
             if positions:
                 for symbol, pos in positions.items():
                     print(f"持仓: {symbol}, 方向: {pos['direction']}, 数量: {pos['volume']}, 价格: {pos['price']}")
@@ -1460,7 +1985,7 @@ def main():
     qapp = create_qapp()
     
     # 创建主引擎
-    main_engine = MainEngine()
+    main_engine = MainEngine(BatchEventEngine())
 
     # 添加币安现货网关
     print("Adding Binance Spot Gateway...")
@@ -1478,10 +2003,11 @@ def main():
         main_window.trading_widget.hide()  # 隐藏交易控件
 
     # 注册事件监听器
-    main_engine.event_engine.register(EVENT_CONTRACT, on_contract)
-    main_engine.event_engine.register(EVENT_ACCOUNT, on_account)
+    # on_account/on_position仅输出控制台日志，不需要时不注册，省去事件分发
+    if _LOG_CONSOLE:
+        main_engine.event_engine.register(EVENT_ACCOUNT, on_account)
+        main_engine.event_engine.register(EVENT_POSITION, on_position)
     main_engine.event_engine.register(EVENT_LOG, on_log)
-    main_engine.event_engine.register(EVENT_POSITION, on_position)
     main_engine.event_engine.register(EVENT_TRADE, on_trade_custom)
     main_engine.event_engine.register(EVENT_ORDER, on_order)
 
@@ -1522,8 +2048,7 @@ def main():
     # 订阅交易对
     if strategy:
         # 直接使用SimpleStrategy的vt_symbol
-        symbol, exchange_str = strategy.vt_symbol.split(".")
-        exchange = Exchange(exchange_str)
+        symbol, exchange = _parse_vt_symbol(strategy.vt_symbol)
         print(f"订阅 {strategy.vt_symbol} 行情...")
     else:
         # 如果策略初始化失败，使用默认设置
@@ -1533,15 +2058,14 @@ def main():
         
     # 创建并发送订阅请求
     subscribe_req = SubscribeRequest(
-        symbol=symbol.lower(),
+        symbol=symbol,
         exchange=exchange
     )
     main_engine.subscribe(subscribe_req, "BINANCE_SPOT")
     print("订阅请求已发送")
     
     # 在单独的线程中运行策略
-    global strategy_running
-    strategy_running = True
+    strategy_stop_event.clear()
     strategy_thread = threading.Thread(
         target=run_strategy_thread, 
         args=(strategy, global_position_tracker),
@@ -1551,8 +2075,7 @@ def main():
     
     # 开始事件循环前，为主窗口关闭添加处理
     def on_main_window_closed():
-        global strategy_running
-        strategy_running = False
+        strategy_stop_event.set()
         print("主窗口关闭，正在停止策略...")
         # 等待策略线程结束
         if strategy_thread.is_alive():
@@ -1578,6 +2101,18 @@ def main():
     # 连接窗口关闭信号
     main_window.closeEvent = lambda event: on_main_window_closed()
 
+    def on_sigterm(signum, frame):
+        """收到SIGTERM时先同步写盘，再退出Qt事件循环"""
+        strategy_stop_event.set()
+        global_position_tracker.flush()
+        qapp.quit()
+    
+    signal.signal(signal.SIGTERM, on_sigterm)
+    # Qt事件循环运行期间，Python信号处理函数要等Qt回调Python时才会执行，用定时器周期性唤醒
+    signal_timer = QtCore.QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(200)
+
     # 启动Qt事件循环
     sys.exit(qapp.exec())
 
@@ -0,0 +1,16 @@
+"""Numba 可选依赖：未安装 numba 时 njit 退化为普通 Python 函数"""
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """numba 不可用时的空装饰器，兼容 @njit 与 @njit(...) 两种写法"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
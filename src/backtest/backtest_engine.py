@@ -1,7 +1,10 @@
 from datetime import datetime
 import sys
+import math
 import logging
+import logging.handlers
 from pathlib import Path
+from operator import attrgetter
 from typing import List, Dict
 from vnpy.trader.object import BarData, OrderData, TradeData
 from vnpy.trader.constant import Exchange, Interval, Status, Direction
@@ -9,13 +12,42 @@ from vnpy_ctastrategy.backtesting import BacktestingEngine, CtaTemplate, Backtes
 from pymongo import MongoClient
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import matplotlib.font_manager as fm
-from matplotlib.widgets import Slider
-import matplotlib.dates as mdates
-from pandas import Timestamp
-from scipy.signal import savgol_filter
+from src._njit import njit, NUMBA_AVAILABLE
+
+# 枚举成员是单例，预先绑定后用is比较
+_LONG = Direction.LONG
+
+# 年化换算系数和日无风险利率(年化2%)
+_SQRT252 = math.sqrt(252.0)
+_DAILY_RF = 0.02 / 252
+
+_trade_fields = attrgetter("datetime", "price", "volume", "direction")
+
+
+def _trade_arrays(trades: List[TradeData]):
+    """一次遍历取出成交的时间、价格、数量和是否买入，返回numpy数组"""
+    n = len(trades)
+    dts, prices, volumes, directions = zip(*map(_trade_fields, trades))
+    return (
+        np.array(dts, dtype="datetime64[ns]"),
+        np.fromiter(prices, dtype=np.float64, count=n),
+        np.fromiter(volumes, dtype=np.float64, count=n),
+        np.fromiter((d is _LONG for d in directions), dtype=np.bool_, count=n),
+    )
+
+
+@njit("float64[:](int64, int64[:], float64[:], float64)", cache=True)
+def build_balance(n, idx, delta, init):
+    """按K线序号升序排列的成交资金变动，一次遍历生成每根K线的账户余额"""
+    out = np.empty(n, np.float64)
+    cur = init
+    j = 0
+    for i in range(n):
+        while j < idx.size and idx[j] == i:
+            cur += delta[j]
+            j += 1
+        out[i] = cur
+    return out
 
 class BacktestEngine:
     def __init__(self):
@@ -24,12 +56,20 @@ class BacktestEngine:
         self.client = MongoClient('localhost', 27017)
         self.db = self.client.crypto_trading
         self.collection = self.db.market_data
+        # (symbol, datetime)复合索引，按交易对和时间范围查询时直接按索引顺序返回
+        # 在首次加载数据时才创建，构造引擎时不连接数据库
+        self.bar_index = [("symbol", 1), ("datetime", 1)]
+        self._bar_index_ready = False
         
         # 设置引擎基础参数
         self.init_capital = 1_000_000  # 初始资金100万
         self.contract_multiplier = 1    # 合约乘数
         self.commission_rate = 0.001    # 手续费率 0.1%
         self.price_tick = 0.01         # 价格精度
+        
+        # 最近一次回测的成交记录和统计结果，供后续统计和绘图复用
+        self._trades = []
+        self._last_stats = None
 
         self.setup_logging()
 
@@ -52,6 +92,9 @@ class BacktestEngine:
         for handler in logger.handlers[:]:
             logger.removeHandler(handler)
         
+        # 文件日志缓冲，配置失败时为None
+        self.log_buffer = None
+        
         # 创建文件处理器
         try:
             file_handler = logging.FileHandler(
@@ -67,8 +110,13 @@ class BacktestEngine:
             )
             file_handler.setFormatter(formatter)
             
+            # 文件处理器外包一层内存缓冲，攒满1024条或出现ERROR时才写盘
+            self.log_buffer = logging.handlers.MemoryHandler(
+                1024, flushLevel=logging.ERROR, target=file_handler
+            )
+            
             # 添加处理器
-            logger.addHandler(file_handler)
+            logger.addHandler(self.log_buffer)
             
             # 添加控制台处理器
             console_handler = logging.StreamHandler(sys.stdout)
@@ -93,7 +141,8 @@ class BacktestEngine:
             console_handler.setFormatter(formatter)
             logger.addHandler(console_handler)
 
-    def load_bar_data(self, symbol: str, start: datetime, end: datetime) -> List[BarData]:
+    def load_bar_arrays(self, symbol: str, start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+        """按列加载K线数据，返回datetime和OHLCV的numpy数组"""
         query = {
             "symbol": symbol,
             "datetime": {
@@ -102,38 +151,77 @@ class BacktestEngine:
             }
         }
         
-        cursor = self.collection.find(query).sort("datetime", 1)
-        bars = []
+        # 只取回测需要的字段，按批次拉取以减少往返
+        projection = {
+            "_id": 0, "datetime": 1, "volume": 1,
+            "open": 1, "high": 1, "low": 1, "close": 1
+        }
+        if not self._bar_index_ready:
+            self.collection.create_index(self.bar_index)
+            self._bar_index_ready = True
+        
+        # 强制走复合索引，排序由索引顺序满足，不会在内存中排序
+        cursor = (
+            self.collection.find(query, projection=projection)
+            .hint(self.bar_index)
+            .sort("datetime", 1)
+            .batch_size(10000)
+        )
         
         print(f"开始加载{symbol}的历史数据...")
         
-        for doc in cursor:
-            # 打印第一条数据用于调试
-            if len(bars) == 0:
-                print("首条数据样例:")
-                print(doc)
-                
-            bar = BarData(
-                symbol=doc["symbol"],
-                exchange=Exchange.LOCAL,
-                datetime=doc["datetime"],
-                interval=Interval.MINUTE,
-                volume=float(doc["volume"]),
-                open_price=float(doc["open"]),
-                high_price=float(doc["high"]),
-                low_price=float(doc["low"]),
-                close_price=float(doc["close"]),
-                gateway_name="BACKTEST"
-            )
-            bars.append(bar)
+        docs = list(cursor)
+        # 打印第一条数据用于调试
+        if docs:
+            print("首条数据样例:")
+            print(docs[0])
+        
+        columns = ["datetime", "open", "high", "low", "close", "volume"]
+        data = pd.DataFrame.from_records(docs, columns=columns)
+        arrays = {"datetime": data["datetime"].to_numpy(dtype="datetime64[ns]")}
+        for name in columns[1:]:
+            arrays[name] = data[name].to_numpy(dtype=np.float64)
         
-        print(f"数据加载完成，共{len(bars)}条K线")
+        n = len(arrays["datetime"])
+        print(f"数据加载完成，共{n}条K线")
         
         # 打印首尾数据时间用于验证
-        if bars:
-            print(f"数据时间范围: {bars[0].datetime} 到 {bars[-1].datetime}")
+        if n:
+            print(f"数据时间范围: {arrays['datetime'][0]} 到 {arrays['datetime'][-1]}")
         
-        return bars
+        return arrays
+
+    @staticmethod
+    def iter_bars(symbol: str, arrays: Dict[str, np.ndarray], start: int = 0, stop: int = None):
+        """从列数组按需构造BarData，只在喂给回测引擎时创建对象"""
+        sl = slice(start, stop)
+        # 先整体转换为Python对象，避免逐元素取numpy标量
+        dts = arrays["datetime"][sl].astype("datetime64[us]").tolist()
+        columns = zip(
+            dts,
+            arrays["open"][sl].tolist(),
+            arrays["high"][sl].tolist(),
+            arrays["low"][sl].tolist(),
+            arrays["close"][sl].tolist(),
+            arrays["volume"][sl].tolist()
+        )
+        for dt, o, h, l, c, v in columns:
+            yield BarData(
+                symbol=symbol,
+                exchange=Exchange.LOCAL,
+                datetime=dt,
+                interval=Interval.MINUTE,
+                volume=v,
+                open_price=o,
+                high_price=h,
+                low_price=l,
+                close_price=c,
+                gateway_name="BACKTEST"
+            )
+
+    def load_bar_data(self, symbol: str, start: datetime, end: datetime) -> List[BarData]:
+        """加载K线数据并转换为BarData列表"""
+        return list(self.iter_bars(symbol, self.load_bar_arrays(symbol, start, end)))
 
     def run_backtest(self, strategy_class, setting: Dict, symbol: str, start: datetime, end: datetime):
         """运行回测"""
@@ -142,6 +230,8 @@ class BacktestEngine:
         logging.info(f"策略参数: {setting}")
         
         print("\n正在初始化回测引擎...")
+        self._trades = []
+        self._last_stats = None
         
         # 设置初始资金
         initial_capital = 1_000_000
@@ -168,63 +258,68 @@ class BacktestEngine:
         self.engine.strategy.trading = True
         
         # 加载数据
-        bars = self.load_bar_data(symbol, start, end)
-        if not bars:
+        arrays = self.load_bar_arrays(symbol, start, end)
+        total = len(arrays["close"])
+        if not total:
             logging.error("加载数据失败，未找到符合条件的K线数据")
             return None
             
-        logging.info(f"成功加载 {len(bars)} 条K线数据")
+        logging.info(f"成功加载 {total} 条K线数据")
+        
+        # 策略支持且numba可用时预先计算整段指标，回放中不再逐K线计算
+        # 没有numba时指标函数退化为纯Python循环，不如ArrayManager逐K线计算快
+        strategy = self.engine.strategy
+        if NUMBA_AVAILABLE and hasattr(strategy, "precompute_indicators"):
+            strategy.precompute_indicators(arrays["close"])
         logging.info("\n开始回测运行...")
         print("\n开始回测运行...")
         
-        # 运行K线回放
-        bar_count = 0
-        for bar in bars:
-            self.engine.new_bar(bar)
-            bar_count += 1
-            if bar_count % 1000 == 0:
-                logging.info(f"已处理 {bar_count}/{len(bars)} 条K线数据")
+        # 运行K线回放，按每10000条K线分段，段末输出一次进度
+        new_bar = self.engine.new_bar
+        step = 10000
+        for start_idx in range(0, total, step):
+            for bar in self.iter_bars(symbol, arrays, start_idx, start_idx + step):
+                new_bar(bar)
+            logging.info("已处理 %d/%d 条K线数据", min(start_idx + step, total), total)
         
         # 完成回测
         self.engine.run_backtesting()
         logging.info("回测运行完成")
         
-        # 获取所有交易记录
-        trades = self.engine.get_all_trades()
+        # 获取所有交易记录，没有成交时直接返回，不构建结果DataFrame和资金曲线
+        trades = self._trades = self.engine.get_all_trades()
         if not trades:
             logging.warning("回测过程中没有产生任何交易")
             print("没有产生任何交易")
+            self.flush_logs()
             return None
             
         logging.info(f"回测产生了 {len(trades)} 笔交易")
         
         # 创建结果DataFrame
-        df = pd.DataFrame()
-        df['datetime'] = [bar.datetime for bar in bars]
-        df['close_price'] = [bar.close_price for bar in bars]
-        df.set_index('datetime', inplace=True)
-        
-        # 计算资金曲线
-        df['balance'] = pd.Series([initial_capital] * len(df), dtype='float64')
-        current_position = 0
-        current_balance = float(initial_capital)
-        
-        for trade in trades:
-            idx = df.index.get_loc(trade.datetime)
-            trade_value = float(trade.price * trade.volume)
-            commission = float(trade_value * self.engine.rate)
-            
-            if trade.direction == Direction.LONG:
-                current_position += trade.volume
-                current_balance -= (trade_value + commission)
-            else:
-                current_position -= trade.volume
-                current_balance += (trade_value - commission)
-            
-            df.loc[df.index[idx:], 'balance'] = pd.Series([current_balance] * (len(df) - idx), index=df.index[idx:])
+        df = pd.DataFrame(
+            {"close_price": arrays["close"]},
+            index=pd.DatetimeIndex(arrays["datetime"], name="datetime")
+        )
+        
+        # 计算资金曲线：每笔成交折算为所在K线上的资金变动，按K线累加后一次性生成余额序列
+        trade_dts, trade_price, trade_volume, is_long = _trade_arrays(trades)
+        # 一次调用解析全部成交时间所在的K线位置
+        trade_idx = df.index.get_indexer(trade_dts).astype(np.int64, copy=False)
+        if (trade_idx < 0).any():
+            raise KeyError(f"成交时间不在K线数据中: {trade_dts[trade_idx < 0][0]}")
+        trade_value = trade_price * trade_volume
+        rate = self.engine.rate
+        commission = trade_value * rate
+        # 买入支出成交额和手续费，卖出收回成交额并扣除手续费
+        trade_delta = np.where(is_long, -(trade_value + commission), trade_value - commission)
+        
+        # 按K线序号稳定排序后交给JIT内核一次生成余额序列
+        order = np.argsort(trade_idx, kind="stable")
+        df['balance'] = build_balance(len(df), trade_idx[order], trade_delta[order], float(initial_capital))
         
         # 计算并打印关键指标
-        stats = self.calculate_statistics(df)
+        stats = self._last_stats = self.calculate_statistics(df, trades=trades)
         if stats:
             logging.info("\n=== 策略评估指标 ===")
             logging.info(f"总收益率: {stats['total_return']:.2f}%")
@@ -239,57 +334,60 @@ class BacktestEngine:
             print(f"信息比率: {stats['information_ratio']:.2f}")
             print(f"最大回撤: {stats['max_drawdown']:.2f}%")
         
+        self.flush_logs()
         return df
 
-    def calculate_statistics(self, df) -> Dict[str, float]:
-        """计算回测统计指标"""
+    def flush_logs(self):
+        """把缓冲中的日志写入文件"""
+        if self.log_buffer:
+            self.log_buffer.flush()
+
+    def calculate_statistics(self, df, trades: List[TradeData] = None) -> Dict[str, float]:
+        """计算回测统计指标，未传入trades时从回测引擎获取"""
         try:
             # 获取所有交易
-            trades = self.engine.get_all_trades()
+            if trades is None:
+                trades = self.engine.get_all_trades()
             if not trades or len(trades) == 0:
                 return None
                 
             # 基础数据准备
             initial_capital = self.engine.capital
-            final_capital = df['balance'].iloc[-1]
-            
-            # 计算日收益率序列
-            daily_returns = df['balance'].pct_change().fillna(0)
+            bal = df['balance'].to_numpy(dtype=np.float64)
+            final_capital = bal[-1]
+            
+            # 计算日收益率序列，首个收益率记为0，相除结果直接写入目标数组
+            rets = np.empty_like(bal)
+            rets[0] = 0.0
+            np.divide(np.diff(bal), bal[:-1], out=rets[1:])
+            daily_returns = pd.Series(rets, index=df.index)
+            # 收益率均值和样本标准差只算一次，夏普比率和信息比率共用
+            ret_mean = float(rets.mean())
+            ret_std = float(rets.std(ddof=1)) if rets.size > 1 else 0.0
             
             # 计算总收益率和年化收益率
             total_return = (final_capital - initial_capital) / initial_capital
             days = (trades[-1].datetime - trades[0].datetime).days
             annual_return = ((1 + total_return) ** (365.0 / max(days, 1))) - 1 if days > 0 else 0
             
-            # 计算夏普比率
-            risk_free_rate = 0.02  # 年化无风险利率
-            daily_risk_free = risk_free_rate / 252
-            excess_returns = daily_returns - daily_risk_free
-            returns_std = float(excess_returns.std() or 1e-6)  # 避免除以0
-            sharpe_ratio = np.sqrt(252) * float(excess_returns.mean()) / returns_std
-            
-            # 计算信息比率
-            benchmark_returns = pd.Series(0, index=df.index)  # 基准收益率设为0
-            active_returns = daily_returns - benchmark_returns
-            active_std = float(active_returns.std() or 1e-6)  # 避免除以0
-            information_ratio = np.sqrt(252) * float(active_returns.mean()) / active_std
-            
-            # 计算最大回撤
-            cummax = df['balance'].expanding().max()
-            drawdown = (df['balance'] - cummax) / cummax
-            max_drawdown = float(drawdown.min() or 0)
-            
-            # 计算胜率
-            winning_trades = 0
-            open_price = None
-            for trade in trades:
-                if trade.direction == Direction.LONG:  # 开仓
-                    open_price = trade.price
-                else:  # 平仓
-                    if open_price is not None:
-                        if trade.price > open_price:
-                            winning_trades += 1
-                        open_price = None
+            # 计算夏普比率，超额收益只是平移，标准差与日收益相同
+            returns_std = ret_std or 1e-6  # 避免除以0
+            sharpe_ratio = _SQRT252 * (ret_mean - _DAILY_RF) / returns_std
+            
+            # 计算信息比率，基准收益率为0，主动收益即日收益
+            active_std = ret_std or 1e-6  # 避免除以0
+            information_ratio = _SQRT252 * ret_mean / active_std
+            
+            # 计算最大回撤，回撤序列保留为Series供绘图使用
+            cummax = np.maximum.accumulate(bal)
+            dd = (bal - cummax) / cummax
+            max_drawdown = float(dd.min() or 0)
+            drawdown = pd.Series(dd, index=df.index)
+            
+            # 计算胜率：紧跟在开仓(多)之后的平仓(空)与该开仓价比较
+            _, prices, _, is_long = _trade_arrays(trades)
+            closes = is_long[:-1] & ~is_long[1:]
+            winning_trades = int(np.count_nonzero(prices[1:][closes] > prices[:-1][closes]))
             total_complete_trades = len(trades) // 2
             win_rate = winning_trades / total_complete_trades if total_complete_trades > 0 else 0
 
@@ -324,11 +422,20 @@ class BacktestEngine:
         """获取当前正在运行的策略实例"""
         return getattr(self, 'strategy', None)
 
+    def get_statistics(self):
+        """获取最近一次回测计算的统计指标"""
+        return self._last_stats
+
     def plot_backtest_results(self, df, trades):
         """绘制回测结果图表"""
+        # 绘图库只在需要出图时导入，不绘图的回测不承担导入开销
+        import matplotlib.pyplot as plt
+        
         try:
-            # 计算统计指标
-            stats = self.calculate_statistics(df)
+            # 复用回测时已计算的统计指标
+            stats = self._last_stats
+            if stats is None:
+                stats = self.calculate_statistics(df, trades=trades)
             if stats is None:
                 print("没有足够的交易数据来生成统计图表")
                 return
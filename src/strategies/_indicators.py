@@ -0,0 +1,63 @@
+"""回测用技术指标：一次性计算整段收盘价序列，结果与ArrayManager逐K线计算一致
+
+各函数声明了显式签名，导入时即从磁盘缓存加载编译结果
+"""
+
+import numpy as np
+
+from src._njit import njit
+
+
+@njit("float64[:](float64[:], int64)", cache=True)
+def sma(arr, w):
+    """简单移动平均，前w-1个位置为NaN"""
+    n = arr.size
+    out = np.empty(n, dtype=np.float64)
+    s = 0.0
+    for i in range(n):
+        s += arr[i]
+        if i >= w:
+            s -= arr[i - w]
+        if i >= w - 1:
+            out[i] = s / w
+        else:
+            out[i] = np.nan
+    return out
+
+
+@njit("float64[:](float64[:], int64, int64)", cache=True)
+def rsi(arr, w, size):
+    """Wilder平滑RSI，每根K线只使用最近size根收盘价，与ArrayManager(size).rsi(w)对应"""
+    n = arr.size
+    out = np.full(n, np.nan)
+    if size <= w:
+        return out
+    for end in range(size - 1, n):
+        start = end - size + 1
+        # 用窗口内前w个价差的均值作为初始平均涨跌幅
+        gain = 0.0
+        loss = 0.0
+        for k in range(start + 1, start + w + 1):
+            diff = arr[k] - arr[k - 1]
+            if diff > 0:
+                gain += diff
+            else:
+                loss -= diff
+        gain /= w
+        loss /= w
+        for k in range(start + w + 1, end + 1):
+            diff = arr[k] - arr[k - 1]
+            gain *= w - 1
+            loss *= w - 1
+            if diff > 0:
+                gain += diff
+            else:
+                loss -= diff
+            gain /= w
+            loss /= w
+        total = gain + loss
+        if -1e-8 < total < 1e-8:
+            out[end] = 0.0
+        else:
+            out[end] = 100.0 * gain / total
+    return out
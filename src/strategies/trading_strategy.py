@@ -21,6 +21,9 @@ from vnpy_ctastrategy import (
 )
 from typing import List, Dict, Set
 import os
+import numpy as np
+
+from src.strategies._indicators import sma, rsi
 
 class MediumFrequencyStrategy(CtaTemplate):
     author = "策略作者"
@@ -73,6 +76,8 @@ class MediumFrequencyStrategy(CtaTemplate):
         
         # 防止日志传播到根日志记录器
         self.logger.propagate = False
+        # 缓存调试级别是否开启，未开启时热路径上不格式化调试信息
+        self._dbg = self.logger.isEnabledFor(logging.DEBUG)
         
         # 参数设置
         self.fast_window = setting.get('fast_window', 10)
@@ -93,6 +98,12 @@ class MediumFrequencyStrategy(CtaTemplate):
         self.am = ArrayManager(100)
         self.active_orders = set()
         
+        # 回测时预先计算的整段指标序列，未设置时在on_bar中用ArrayManager计算
+        self.fast_ma_arr = None
+        self.slow_ma_arr = None
+        self.rsi_arr = None
+        self.bar_idx = 0
+        
         self.trading_executor = None
 
         self.logger.info("策略初始化完成")
@@ -130,8 +141,9 @@ class MediumFrequencyStrategy(CtaTemplate):
     def on_tick(self, tick: TickData):
         """行情更新回调"""
         # 减少日志输出，只在调试模式下输出
-        self.write_debug(f"收到行情更新 - {tick.symbol}")
-        self.write_debug(f"最新价: {tick.last_price}, 买一价: {tick.bid_price_1}, 卖一价: {tick.ask_price_1}")
+        if self._dbg:
+            self.logger.debug("收到行情更新 - %s", tick.symbol)
+            self.logger.debug("最新价: %s, 买一价: %s, 卖一价: %s", tick.last_price, tick.bid_price_1, tick.ask_price_1)
 
     def calculate_trade_volume(self, price):
         """计算交易量
@@ -170,31 +182,43 @@ class MediumFrequencyStrategy(CtaTemplate):
         # 确保交易量不小于最小交易量
         return max(volume, self.min_volume)
 
+    def precompute_indicators(self, close: np.ndarray):
+        """根据回测全部收盘价一次性计算均线和RSI，on_bar按K线序号读取"""
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        self.fast_ma_arr = sma(close, self.fast_window)
+        self.slow_ma_arr = sma(close, self.slow_window)
+        self.rsi_arr = rsi(close, self.rsi_window, self.am.size)
+        self.bar_idx = 0
+
     def on_bar(self, bar: BarData):
         """K线更新回调"""
-        self.am.update_bar(bar)
-        if not self.am.inited:
-            return
+        if self.rsi_arr is not None:
+            idx = self.bar_idx
+            self.bar_idx += 1
+            # 与ArrayManager一致，凑满am.size根K线后才开始计算信号
+            if idx + 1 < self.am.size:
+                return
+            fast_ma = self.fast_ma_arr[idx]
+            slow_ma = self.slow_ma_arr[idx]
+            rsi_value = self.rsi_arr[idx]
+        else:
+            self.am.update_bar(bar)
+            if not self.am.inited:
+                return
 
-        # 计算指标
-        fast_ma = self.am.sma(self.fast_window)
-        slow_ma = self.am.sma(self.slow_window)
-        rsi_value = self.am.rsi(self.rsi_window)
-        
-        # 记录K线信息
-        self.write_debug(f"\n{'='*50}")
-        self.write_debug(f"K线时间(回测): {bar.datetime}")
-        self.write_debug(f"开盘价: {bar.open_price:.2f}")
-        self.write_debug(f"最高价: {bar.high_price:.2f}")
-        self.write_debug(f"最低价: {bar.low_price:.2f}")
-        self.write_debug(f"收盘价: {bar.close_price:.2f}")
-        self.write_debug(f"成交量: {bar.volume}")
+            # 计算指标
+            fast_ma = self.am.sma(self.fast_window)
+            slow_ma = self.am.sma(self.slow_window)
+            rsi_value = self.am.rsi(self.rsi_window)
         
-        # 记录指标信息
-        self.write_debug(f"\n技术指标:")
-        self.write_debug(f"快速MA: {fast_ma:.2f}")
-        self.write_debug(f"慢速MA: {slow_ma:.2f}")
-        self.write_debug(f"RSI: {rsi_value:.2f}")
+        # 记录K线和指标信息，仅在调试级别开启时格式化
+        if self._dbg:
+            self.logger.debug(
+                "\n%s\nK线时间(回测): %s\n开盘价: %.2f\n最高价: %.2f\n最低价: %.2f\n收盘价: %.2f\n成交量: %s"
+                "\n\n技术指标:\n快速MA: %.2f\n慢速MA: %.2f\nRSI: %.2f",
+                "=" * 50, bar.datetime, bar.open_price, bar.high_price, bar.low_price,
+                bar.close_price, bar.volume, fast_ma, slow_ma, rsi_value
+            )
         
         # 交易信号判断
         if self.pos > 0:
@@ -231,15 +255,18 @@ class MediumFrequencyStrategy(CtaTemplate):
         if not order_time:
             order_time = datetime.now()
             
-        self.write_log(f"\n=== 订单更新 ===")
-        self.write_log(f"订单时间(回测): {order_time}")
-        self.write_log(f"订单编号: {order.orderid}")
-        self.write_log(f"订单状态: {order.status}")
-        self.write_log(f"委托价格: {order.price}")
-        self.write_log(f"委托数量: {order.volume}")
-        self.write_log(f"委托方向: {order.direction}")
-        self.write_log(f"委托类型: {order.type}")
-        self.write_log(f"交易所: {order.exchange}")
+        # 合并为一条日志，每次订单推送只调用一次write_log
+        self.write_log(
+            f"\n=== 订单更新 ===\n"
+            f"订单时间(回测): {order_time}\n"
+            f"订单编号: {order.orderid}\n"
+            f"订单状态: {order.status}\n"
+            f"委托价格: {order.price}\n"
+            f"委托数量: {order.volume}\n"
+            f"委托方向: {order.direction}\n"
+            f"委托类型: {order.type}\n"
+            f"交易所: {order.exchange}"
+        )
 
     def on_trade(self, trade: TradeData):
         """成交回调"""
@@ -248,15 +275,18 @@ class MediumFrequencyStrategy(CtaTemplate):
         if not trade_time:
             trade_time = datetime.now()
             
-        self.write_log(f"\n=== 成交信息 ===")
-        self.write_log(f"成交时间(回测): {trade_time}")
-        self.write_log(f"成交编号: {trade.tradeid}")
-        self.write_log(f"成交方向: {trade.direction}")
-        self.write_log(f"成交价格: {trade.price}")
-        self.write_log(f"成交数量: {trade.volume}")
-        self.write_log(f"成交金额: {trade.price * trade.volume:.2f}")
-        self.write_log(f"交易所: {trade.exchange}")
-        self.write_log(f"当前持仓: {self.pos}")
+        # 合并为一条日志，每次成交推送只调用一次write_log
+        self.write_log(
+            f"\n=== 成交信息 ===\n"
+            f"成交时间(回测): {trade_time}\n"
+            f"成交编号: {trade.tradeid}\n"
+            f"成交方向: {trade.direction}\n"
+            f"成交价格: {trade.price}\n"
+            f"成交数量: {trade.volume}\n"
+            f"成交金额: {trade.price * trade.volume:.2f}\n"
+            f"交易所: {trade.exchange}\n"
+            f"当前持仓: {self.pos}"
+        )
         
         # 计算当前盈亏
         if self.pos != 0:
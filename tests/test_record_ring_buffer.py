@@ -0,0 +1,44 @@
+import unittest
+
+try:
+    from run_live_trading import RecordRingBuffer, SimpleTCA
+except ImportError:  # 未安装vnpy等实盘依赖时跳过
+    RecordRingBuffer = None
+
+
+@unittest.skipIf(RecordRingBuffer is None, "需要安装run_live_trading的依赖")
+class RecordRingBufferTest(unittest.TestCase):
+    """环形缓冲区覆盖旧记录时订单索引的回归测试"""
+
+    def test_wraparound_keeps_repeated_id(self):
+        buf = RecordRingBuffer(capacity=4)
+        for order_id in ["A", "B", "A", "C", "D"]:
+            buf.append(1.0, 1, 1.0, order_id)
+
+        # 首条A被D覆盖，第二条A仍在缓冲区中
+        self.assertIn("A", buf)
+        self.assertEqual(buf.order_id[buf.slot_of["A"]], "A")
+
+        # 最后一条A也被覆盖后索引才删除
+        buf.append(1.0, 1, 1.0, "E")
+        buf.append(1.0, 1, 1.0, "F")
+        self.assertNotIn("A", buf)
+        self.assertNotIn("B", buf)
+
+    def test_index_points_to_oldest_live_record(self):
+        buf = RecordRingBuffer(capacity=4)
+        for i, order_id in enumerate(["A", "B", "A", "A", "C"]):
+            buf.append(float(i), 1, 1.0, order_id)
+
+        # 覆盖第0条后，A应指向仍存在的最早一条(价格2.0)
+        self.assertEqual(buf.price[buf.slot_of["A"]], 2.0)
+
+    def test_tca_has_order_after_wraparound(self):
+        tca = SimpleTCA(capacity=4)
+        for order_id in ["A", "B", "A", "C", "D"]:
+            tca.record_order(1.0, "多", 1.0, order_id)
+        self.assertTrue(tca.has_order("A"))
+
+
+if __name__ == "__main__":
+    unittest.main()